@@ -1,28 +1,249 @@
-from django.http import HttpResponseForbidden
+# anti_ddos.py
+"""
+Per-IP request rate limit: at most ANTI_DDOS_RATE requests per
+ANTI_DDOS_WINDOW seconds.
+
+Sliding-window counter: each IP keeps the request counts of the current and
+the previous fixed window, and the previous count is weighted by how much of
+that window still overlaps the sliding one. That's O(1) per request and one
+packed int per IP, where a list of timestamps cost O(rate) for both.
+
+IPs are kept in least-recently-seen order. An IP idle for two windows has
+no state left and is dropped; past ANTI_DDOS_MAX_KEYS IPs the least recently
+seen ones are dropped as well (they'd start again from zero).
+
+Where the counters live is set by ANTI_DDOS_BACKEND:
+
+- "mmap": a memory-mapped file shared by all worker processes of the host
+  (SharedMemoryLimiter), so N workers still allow ANTI_DDOS_RATE in total,
+- "cache": the Django cache ANTI_DDOS_CACHE, for several hosts
+  (CacheLimiter); needs a backend with atomic incr (memcached, Redis),
+- "local": per process (SlidingWindowLimiter), also the fallback when the
+  shared file can't be used.
+
+Counters: `anti_ddos.blocked`, `anti_ddos.evicted` (IPs dropped by the cap).
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
 import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponseForbidden
+from . import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+ANTI_DDOS_RATE = getattr(settings, 'ANTI_DDOS_RATE', 100)
+ANTI_DDOS_WINDOW = getattr(settings, 'ANTI_DDOS_WINDOW', 60)  # seconds
+ANTI_DDOS_MAX_KEYS = getattr(settings, 'ANTI_DDOS_MAX_KEYS', 200000)
+ANTI_DDOS_BACKEND = getattr(settings, 'ANTI_DDOS_BACKEND', 'local')
+ANTI_DDOS_MMAP_PATH = getattr(settings, 'ANTI_DDOS_MMAP_PATH', os.path.join(tempfile.gettempdir(), 'metag-anti-ddos'))
+ANTI_DDOS_MMAP_BUCKETS = getattr(settings, 'ANTI_DDOS_MMAP_BUCKETS', 32768)  # x 8 IPs, 128 bytes each
+ANTI_DDOS_CACHE = getattr(settings, 'ANTI_DDOS_CACHE', 'default')
+ANTI_DDOS_EXEMPT = set(getattr(settings, 'ANTI_DDOS_EXEMPT', ()))  # IPs, e.g. a load generator
+
+COUNT_MASK = 0xFFFF  # Counts are packed in 16 bits
+
+
+class SlidingWindowLimiter:
+    """
+    Args:
+        limit (int): Requests allowed per window (below 65535).
+        window (float): Window length in seconds.
+        max_keys (int): Keys kept at most.
+    """
+
+    def __init__(self, limit, window, max_keys):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        # key -> window index << 32 | previous count << 16 | current count
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def hit(self, key, now=None):
+        """Count a request for `key`; False when it is over the limit."""
+        index, overlap = _window(now, self.window)
+
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                previous = current = 0
+            else:
+                self._keys.move_to_end(key)
+                last = state >> 32
+                previous, current = (state >> 16) & COUNT_MASK, state & COUNT_MASK
+                if last != index:
+                    previous, current = (current if last == index - 1 else 0), 0
+
+            allowed = previous * overlap + current < self.limit
+            if allowed:
+                current = min(current + 1, COUNT_MASK)
+            self._keys[key] = index << 32 | previous << 16 | current
+
+            if state is None:
+                self._evict(index)
+        return allowed
+
+    def _evict(self, index):
+        keys = self._keys
+        while keys:
+            _, state = next(iter(keys.items()))
+            if state >> 32 < index - 1:
+                keys.popitem(last=False)  # Idle for two windows: nothing left to remember
+            elif len(keys) > self.max_keys:
+                keys.popitem(last=False)
+                metrics.incr('anti_ddos.evicted')
+            else:
+                break
+
+
+def _window(now, window):
+    """(index of the fixed window `now` is in, part of the previous one still inside the sliding window)"""
+    position = (time.time() if now is None else now) / window
+    index = int(position)
+    return index, 1 - (position - index)
+
+
+class SharedMemoryLimiter:
+    """
+    Sliding-window counters in a memory-mapped file, shared by every process
+    that opens the same path.
+
+    The file is a hash table of `buckets` buckets of 8 slots; an IP hashes to
+    one bucket and takes a slot in it, or the slot that has been idle the
+    longest. A slot is (key hash, window index, previous count, current
+    count). Each request locks only its bucket: a byte-range lock on the
+    file between processes plus one of a few thread locks within a process.
+    """
+    SLOT = struct.Struct('<QIHH')
+    BUCKET_SLOTS = 8
+    BUCKET_SIZE = SLOT.size * BUCKET_SLOTS
+    THREAD_LOCKS = 64
+
+    def __init__(self, limit, window, path, buckets):
+        self.limit = limit
+        self.window = window
+        self.buckets = buckets
+        size = buckets * self.BUCKET_SIZE
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)  # Zero-filled: all slots free
+        self._map = mmap.mmap(self._fd, size)
+        self._locks = [threading.Lock() for _ in range(self.THREAD_LOCKS)]
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'little') | 1  # 0 marks a free slot
+
+    def _slot(self, offset, digest):
+        """Offset and state of `digest`'s slot in the bucket at `offset` (state None: taken over)."""
+        victim, oldest = offset, None
+        for slot in range(offset, offset + self.BUCKET_SIZE, self.SLOT.size):
+            state = self.SLOT.unpack_from(self._map, slot)
+            if state[0] == digest:
+                return slot, state
+            if oldest is None or state[1] < oldest:
+                victim, oldest = slot, state[1]
+        return victim, None
+
+    def hit(self, key, now=None):
+        """Count a request for `key`; False when it is over the limit."""
+        index, overlap = _window(now, self.window)
+        digest = self._hash(key)
+        bucket = digest % self.buckets
+        offset = bucket * self.BUCKET_SIZE
+
+        with self._locks[bucket % self.THREAD_LOCKS]:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.BUCKET_SIZE, offset)
+            try:
+                slot, state = self._slot(offset, digest)
+                previous = current = 0
+                if state is not None:
+                    _, last, previous, current = state
+                    if last != index:
+                        previous, current = (current if last == index - 1 else 0), 0
+
+                allowed = previous * overlap + current < self.limit
+                if allowed:
+                    current = min(current + 1, COUNT_MASK)
+                self.SLOT.pack_into(self._map, slot, digest, index, previous, current)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.BUCKET_SIZE, offset)
+        return allowed
+
+
+class CacheLimiter:
+    """
+    Sliding-window counters in a Django cache, one entry per IP and window,
+    updated with atomic incr/decr (exact with memcached or Redis; the local
+    memory and file caches don't share or lock their counters).
+    """
+
+    def __init__(self, limit, window, alias):
+        self.limit = limit
+        self.window = window
+        self.alias = alias
+
+    def hit(self, key, now=None):
+        """Count a request for `key`; False when it is over the limit."""
+        cache = caches[self.alias]
+        index, overlap = _window(now, self.window)
+        current_key = f'anti_ddos:{key}:{index}'
+        try:
+            current = cache.incr(current_key)
+        except ValueError:
+            cache.add(current_key, 0, timeout=self.window * 2 + 1)
+            current = cache.incr(current_key)
+        previous = cache.get(f'anti_ddos:{key}:{index - 1}', 0)
+
+        if previous * overlap + current - 1 < self.limit:
+            return True
+        cache.decr(current_key)  # Blocked requests don't count
+        return False
+
+
+def get_limiter(backend=None):
+    """Limiter for ANTI_DDOS_BACKEND (or `backend`)."""
+    backend = backend or ANTI_DDOS_BACKEND
+    if backend == 'cache':
+        return CacheLimiter(ANTI_DDOS_RATE, ANTI_DDOS_WINDOW, ANTI_DDOS_CACHE)
+    if backend == 'mmap':
+        try:
+            if fcntl is None:
+                raise OSError("no fcntl on this platform")
+            return SharedMemoryLimiter(ANTI_DDOS_RATE, ANTI_DDOS_WINDOW, ANTI_DDOS_MMAP_PATH,
+                                       ANTI_DDOS_MMAP_BUCKETS)
+        except OSError as e:
+            logger.warning(f"Shared rate limit state unavailable ({e}), limiting per process")
+    elif backend != 'local':
+        raise ValueError(f"Unknown ANTI_DDOS_BACKEND: {backend}")
+    return SlidingWindowLimiter(ANTI_DDOS_RATE, ANTI_DDOS_WINDOW, ANTI_DDOS_MAX_KEYS)
+
 
 class AntiDDoSMiddleware:
     def __init__(self, get_response):
         self.get_response = get_response
-        self.request_count = {}
+        self.limiter = get_limiter()
 
     def __call__(self, request):
         ip = request.META.get('REMOTE_ADDR')
-        current_time = int(time.time())
-
-        # Track requests per IP
-        if ip not in self.request_count:
-            self.request_count[ip] = []
-
-        # Remove old timestamps
-        self.request_count[ip] = [
-            t for t in self.request_count[ip]
-            if t > current_time - 60  # 60-second window
-        ]
-
-        # Allow max 100 requests per minute per IP
-        if len(self.request_count[ip]) >= 100:
+        if ip not in ANTI_DDOS_EXEMPT and not self.limiter.hit(ip):
+            metrics.incr('anti_ddos.blocked')
             return HttpResponseForbidden("Too many requests")
-
-        self.request_count[ip].append(current_time)
-        return self.get_response(request)
\ No newline at end of file
+        return self.get_response(request)
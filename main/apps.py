@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_finished
 
 
 class MainConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "main"
+
+    def ready(self):
+        from . import jobs, post_cache, quotas  # noqa: F401  post_cache connects the invalidation signals
+        quotas.check_cache()
+        # Re-queue orphaned generation jobs once a process serves requests
+        request_finished.connect(jobs.start, dispatch_uid='generation_job_recovery')
@@ -0,0 +1,223 @@
+# async_views.py
+"""
+Native async versions of the AI and scraping endpoints for the ASGI stack
+(metag/asgi.py). While a request waits on Gemini or a scraped page it only
+holds a coroutine, so one process can keep hundreds of calls in flight.
+
+DRF has no async views, so these are plain Django views that authenticate
+with the same JWT backend and return the same payloads as main/views.py.
+Streaming (?stream=1) and queued (?async=1) requests are handed to the sync
+views, which already avoid blocking on the LLM round trip.
+"""
+import json
+import logging
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from .models import Post
+from .serializers import PostSerializer
+from . import fetch, generation, quotas, transcripts, views
+from .singleflight import SingleFlight
+from .transcript_providers import TranscriptUnavailable
+
+logger = logging.getLogger(__name__)
+
+_jwt = JWTAuthentication()
+
+
+async def _authenticate(request):
+    try:
+        result = await sync_to_async(_jwt.authenticate)(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+def async_api_view(methods):
+    """
+    Async equivalent of @api_view + @permission_classes([IsAuthenticated]).
+
+    Sets `request.user`, and `request.data` from the JSON (or form) body.
+    """
+    def decorator(func):
+        @csrf_exempt
+        @wraps(func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+
+            user = await _authenticate(request)
+            if user is None:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+            request.user = user
+
+            if request.content_type == 'application/json':
+                try:
+                    request.data = json.loads(request.body or b'{}')
+                except ValueError:
+                    return JsonResponse({'detail': 'JSON parse error'}, status=400)
+            else:
+                request.data = request.POST
+
+            return await func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _delegates_to_sync(request):
+    return request.GET.get('stream') in ('1', 'true') or request.GET.get('async') in ('1', 'true')
+
+
+async def extract_content_async(url):
+    """Async counterpart of views.extract_content."""
+    url = (url or '').strip()
+    return await views.fetch_flights.ado(views.page_flight_key(url), lambda: fetch.aread_page(url))
+
+
+async def get_youtube_transcript_async(url, selection=None):
+    """Async counterpart of views.get_youtube_transcript."""
+    url = (url or '').strip()
+    try:
+        transcript = await views.fetch_flights.ado(
+            SingleFlight.key('transcript', transcripts.video_id(url) or url),
+            lambda: transcripts.aload(url))
+        # May look up chapters / timestamps
+        return await sync_to_async(transcripts.select, thread_sensitive=False)(transcript, selection)
+    except TranscriptUnavailable as e:
+        return {"error": str(e)}
+
+
+async def _save_post(user, generated_data, cta=None):
+    """Async counterpart of views.save_generated_post."""
+    post = views.build_generated_post(user, generated_data, cta)
+    await post.asave()
+    return post
+
+
+async def _update_post(post, generated_data):
+    """Async counterpart of views.update_generated_post."""
+    views.apply_generated_post(post, generated_data)
+    await post.asave()
+    return post
+
+
+async def _generate_post(request, prompt, cta=None, report_tokens=False):
+    try:
+        generated_data = await generation.agenerate_json(prompt)
+        post = await _save_post(request.user, generated_data, cta)
+        data = PostSerializer(post).data
+        if report_tokens:
+            data['prompt_tokens'] = generation.estimate_tokens(prompt)
+        return JsonResponse(data, status=201)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid AI response format'}, status=500)
+    except KeyError as e:
+        return JsonResponse({'error': f'Missing required field: {str(e)}'}, status=500)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@async_api_view(['POST'])
+@quotas.limit('llm')
+async def post_create_text(request):
+    if _delegates_to_sync(request):
+        return await sync_to_async(views.post_create_text)(request)
+
+    prompt = generation.text_post_prompt(request.data.get('topic'), request.data.get('tone'))
+    return await _generate_post(request, prompt, request.data.get('cta'))
+
+
+@async_api_view(['POST'])
+@quotas.limit('llm', 'scrape')
+async def post_create_youtube(request):
+    if _delegates_to_sync(request):
+        return await sync_to_async(views.post_create_youtube)(request)
+
+    try:
+        selection = transcripts.parse_selection(request.data)
+        text = await get_youtube_transcript_async(request.data.get('y_url'), selection)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if not text or isinstance(text, dict):
+        return JsonResponse({'error': 'Could not Fetch youtube video'}, status=400)
+
+    text = await generation.areduce_source(text)
+    prompt = generation.youtube_post_prompt(text, request.data.get('tone'))
+    return await _generate_post(request, prompt, report_tokens=True)
+
+
+@async_api_view(['POST'])
+@quotas.limit('llm', 'scrape')
+async def post_create_url(request):
+    if _delegates_to_sync(request):
+        return await sync_to_async(views.post_create_url)(request)
+
+    text = await extract_content_async(request.data.get('w_url'))
+    if not text:
+        return JsonResponse({'error': 'Could not Fetch youtube video'}, status=400)
+
+    text = await generation.areduce_source(text)
+    prompt = generation.url_post_prompt(text, request.data.get('tone'))
+    return await _generate_post(request, prompt)
+
+
+@async_api_view(['POST'])
+@quotas.limit('llm')
+async def regenerate_post(request, pk):
+    if _delegates_to_sync(request):
+        return await sync_to_async(views.regenerate_post)(request, pk=pk)
+
+    try:
+        post = await Post.objects.aget(pk=pk, user=request.user)
+
+        prompt = generation.regenerate_prompt(post.title, post.content)
+        generated_data = await generation.agenerate_json(prompt)
+
+        await _update_post(post, generated_data)
+
+        return JsonResponse(PostSerializer(post).data)
+
+    except Post.DoesNotExist:
+        return HttpResponse(status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@async_api_view(['POST'])
+@quotas.limit('llm')
+async def get_topics(request):
+    try:
+        field = request.data.get('field')
+        sub_field = request.data.get('sub_field')
+
+        topics = await generation.asuggest_topics(field, sub_field)
+
+        return JsonResponse({'field': field, 'sub_field': sub_field,
+                             'suggestions': topics})
+
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+
+@async_api_view(['POST'])
+@quotas.limit('llm')
+async def post_edit_ai(request):
+    content = request.data.get('content')
+    prompt_text = request.data.get('prompt', 'improve')
+
+    response_text = await generation.agenerate(generation.edit_prompt(content, prompt_text))
+    try:
+        generated_data = generation.extract_json(response_text)
+    except ValueError:
+        try:
+            fallback = json.loads(response_text)
+            return JsonResponse({"result": fallback['content']})
+        except Exception:
+            return JsonResponse({'error': 'Could no generate'}, status=400)
+
+    return JsonResponse({"result": generated_data['content']})
@@ -0,0 +1,84 @@
+# compression.py
+"""
+Compresses JSON responses of at least COMPRESSION_MIN_SIZE bytes: brotli
+when the client accepts it and the `brotli` package is installed, gzip
+otherwise. Smaller responses aren't worth the CPU, and streaming ones
+(the SSE endpoints) are left alone so events aren't held back.
+
+Goes near the top of MIDDLEWARE, above anything reading the response body.
+
+Counters: `compression.br`, `compression.gzip`, `compression.bytes_saved`.
+"""
+import gzip
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from . import metrics
+from .etags import encoded
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)  # bytes
+COMPRESSION_TYPES = getattr(settings, 'COMPRESSION_TYPES', ('application/json',))
+COMPRESSION_GZIP_LEVEL = getattr(settings, 'COMPRESSION_GZIP_LEVEL', 6)
+# 11 is for static files; 4-6 compress better than gzip at a similar speed
+COMPRESSION_BROTLI_QUALITY = getattr(settings, 'COMPRESSION_BROTLI_QUALITY', 5)
+
+
+def accepted_codings(header):
+    """Codings an Accept-Encoding header allows (q > 0)"""
+    codings = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        q = params.strip().removeprefix('q=')
+        try:
+            if params and float(q) <= 0:
+                continue
+        except ValueError:
+            continue
+        codings.add(coding.strip().lower())
+    return codings
+
+
+def compress(content, coding):
+    if coding == 'br':
+        return brotli.compress(content, quality=COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(content, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '').split(';')[0].strip()
+        if response.streaming or content_type not in COMPRESSION_TYPES or response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < COMPRESSION_MIN_SIZE:
+            return response
+
+        accepted = accepted_codings(request.headers.get('Accept-Encoding', ''))
+        if brotli is not None and 'br' in accepted:
+            coding = 'br'
+        elif 'gzip' in accepted:
+            coding = 'gzip'
+        else:
+            return response
+
+        compressed = compress(response.content, coding)
+        if len(compressed) >= len(response.content):
+            return response
+
+        metrics.incr(f'compression.{coding}')
+        metrics.incr('compression.bytes_saved', len(response.content) - len(compressed))
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = coding
+        if response.has_header('ETag'):
+            response['ETag'] = encoded(response['ETag'], coding)
+        return response
@@ -0,0 +1,67 @@
+# etags.py
+"""
+Conditional GET for the post endpoints.
+
+An ETag is a hash of what a response is made of: the ids and `updated`
+stamps of its posts, their time_ago text and the page links / totals,
+never the content itself. It is computed before anything is serialized,
+so a matching If-None-Match is answered 304 without a serializer pass,
+rendering or body, but not without a query: post_list reads the page's
+rows, and post detail the one `updated` stamp that post_cache checks its
+entries against (which is what keeps a 304 right across workers).
+
+Responses are `Cache-Control: private, no-cache`: browsers keep them and
+revalidate on every use, shared caches don't store them.
+
+CompressionMiddleware tags the ETag of a compressed response with its
+coding ("...-gzip"), so the two representations never share one; the tag is
+ignored when comparing If-None-Match.
+
+Counters: `etag.not_modified`.
+"""
+import hashlib
+import re
+from django.utils.cache import patch_cache_control
+from rest_framework import status
+from rest_framework.response import Response
+from . import metrics
+from .serializers import time_ago
+
+CODING_SUFFIX = re.compile(r'-(gzip|br)"$')
+
+
+def make(*parts):
+    """Strong ETag of `parts` (anything with a stable repr)"""
+    return '"%s"' % hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def post_stamp(post):
+    """What a post contributes to an ETag (the columns of post_list's cards)"""
+    return str(post.pk), post.updated.isoformat(), time_ago(post.created)
+
+
+def encoded(etag, coding):
+    """ETag of the `coding` encoded representation"""
+    if etag.startswith('"') and not CODING_SUFFIX.search(etag):
+        return f'{etag[:-1]}-{coding}"'
+    return etag
+
+
+def _matches(if_none_match, etag):
+    if if_none_match.strip() == '*':
+        return True
+    # Weak comparison (RFC 9110 13.1.2), whatever coding the client has
+    candidates = (tag.strip().removeprefix('W/') for tag in if_none_match.split(','))
+    return any(CODING_SUFFIX.sub('"', tag) == etag for tag in candidates)
+
+
+def respond(request, etag, build):
+    """304 when `request` already has `etag`, otherwise the Response build() makes."""
+    if _matches(request.headers.get('If-None-Match', ''), etag):
+        metrics.incr('etag.not_modified')
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = build()
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
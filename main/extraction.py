@@ -0,0 +1,298 @@
+# extraction.py
+"""
+Single-pass main-content extraction from HTML.
+
+The document is walked once. Every visible text node is stripped and
+appended to one flat list, and each element only remembers the
+[start, end) slice of that list its subtree covers. Subtree text is then a
+join over a slice and subtree text length a prefix-sum lookup, instead of
+a fresh get_text() walk per element.
+
+lxml is used as the parser when it is installed; otherwise the stdlib
+HTMLParser is driven directly, without building a BeautifulSoup tree.
+StreamExtractor accepts the page chunk by chunk, so a download can stop as
+soon as enough text has been seen.
+"""
+import codecs
+from html.parser import HTMLParser
+from bs4 import UnicodeDammit
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # pragma: no cover - optional speedup
+    lxml = None
+
+HEADER_LEVELS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+PARAGRAPH_TAGS = {'p', 'li'}
+ITEM_TAGS = set(HEADER_LEVELS) | PARAGRAPH_TAGS | {'div'}
+ROOT_TAGS = {'article', 'main'}
+# Text inside these counts towards StreamExtractor.text_chars
+CONTENT_TAGS = set(HEADER_LEVELS) | PARAGRAPH_TAGS
+# Their text never counts as page content (same as BeautifulSoup's get_text)
+SKIP_TAGS = {'script', 'style', 'template'}
+VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+             'meta', 'param', 'source', 'track', 'wbr'}
+
+# Divs are only kept when their text is longer than this
+DIV_MIN_LENGTH = 100
+
+
+class _Collector:
+    """Receives start/data/end events and records text slices per element."""
+
+    def __init__(self):
+        self.strings = []
+        self.items = []   # (ordinal, tag, start, end)
+        self.roots = []   # (ordinal, last descendant ordinal) for article/main
+        self.body = None
+        self.text_chars = 0
+        self._stack = []  # (tag, ordinal, start)
+        self._open = {}   # tag -> number of open elements
+        self._ordinal = 0
+        self._skip = 0
+        self._text = []   # Pieces of the current text node
+
+    def start(self, tag):
+        self._flush()
+        self._ordinal += 1
+        self._stack.append((tag, self._ordinal, len(self.strings)))
+        self._open[tag] = self._open.get(tag, 0) + 1
+        if tag in SKIP_TAGS:
+            self._skip += 1
+
+    def data(self, text):
+        # Streaming parsers may deliver one text node in several pieces
+        if text and not self._skip:
+            self._text.append(text)
+
+    def boundary(self):
+        """A comment or similar node ends the current text node."""
+        self._flush()
+
+    def _flush(self):
+        if self._text:
+            text = ''.join(self._text).strip()
+            self._text = []
+            if text:
+                self.strings.append(text)
+                if any(self._open.get(tag) for tag in CONTENT_TAGS):
+                    self.text_chars += len(text)
+
+    def end(self):
+        self._flush()
+        tag, ordinal, start = self._stack.pop()
+        self._open[tag] -= 1
+        if tag in SKIP_TAGS:
+            self._skip -= 1
+        if tag in ITEM_TAGS:
+            self.items.append((ordinal, tag, start, len(self.strings)))
+        elif tag in ROOT_TAGS:
+            self.roots.append((ordinal, self._ordinal))
+        elif tag == 'body' and self.body is None:
+            self.body = (ordinal, self._ordinal)
+
+    def end_tag(self, tag):
+        """End tag from a non-tree parser: close up to the matching open element."""
+        self._flush()
+        if not self._open.get(tag):
+            return  # Stray end tag
+        while self._stack[-1][0] != tag:
+            self.end()
+        self.end()
+
+    def finish(self):
+        self._flush()
+        while self._stack:
+            self.end()
+
+        if self.roots:
+            root = min(self.roots)
+        elif self.body:
+            root = self.body
+        else:
+            root = (0, self._ordinal)
+        first, last = root
+
+        strings = self.strings
+        prefix = [0]
+        for text in strings:
+            prefix.append(prefix[-1] + len(text))
+
+        headers, paragraphs, divs = [], [], []
+        for ordinal, tag, start, end in sorted(self.items):
+            if not first < ordinal <= last:
+                continue
+            if tag in HEADER_LEVELS:
+                headers.append(f"\n{'#' * HEADER_LEVELS[tag]} {''.join(strings[start:end])}\n")
+            elif tag in PARAGRAPH_TAGS:
+                if end > start:
+                    paragraphs.append(' '.join(strings[start:end]))
+            elif prefix[end] - prefix[start] > DIV_MIN_LENGTH:
+                divs.append(' '.join(strings[start:end]))
+
+        # Deduplicate while preserving order
+        return '\n'.join(dict.fromkeys(headers + paragraphs + divs)).strip()
+
+
+class _EventParser(HTMLParser):
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag)
+        if tag in VOID_TAGS:
+            self.collector.end()
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag)
+        self.collector.end()
+
+    def handle_endtag(self, tag):
+        self.collector.end_tag(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_comment(self, data):
+        self.collector.boundary()
+
+    handle_pi = handle_decl = handle_comment
+
+
+def _walk_stdlib(html, collector):
+    if isinstance(html, bytes):
+        html = UnicodeDammit(html, is_html=True).unicode_markup or ''
+    parser = _EventParser(collector)
+    parser.feed(html)
+    parser.close()
+
+
+def _walk_lxml(html, collector):
+    try:
+        root = lxml.html.document_fromstring(html)
+    except (etree.ParserError, ValueError):
+        return
+
+    stack = [(root, True)]
+    while stack:
+        element, entering = stack.pop()
+        if not entering:
+            collector.end()
+            collector.data(element.tail)
+        elif isinstance(element.tag, str):
+            collector.start(element.tag)
+            collector.data(element.text)
+            stack.append((element, False))
+            stack.extend((child, True) for child in reversed(element))
+        else:
+            # Comments / processing instructions: only the trailing text counts
+            collector.boundary()
+            collector.data(element.tail)
+
+
+class _LxmlTarget:
+    """lxml parser target forwarding events to a _Collector."""
+
+    def __init__(self, collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        self.collector.start(tag)
+
+    def end(self, tag):
+        self.collector.end()
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        self.collector.boundary()
+
+    def pi(self, target, data=None):
+        self.collector.boundary()
+
+    def close(self):
+        pass
+
+
+class StreamExtractor:
+    """
+    Incremental extract_text(): feed() raw chunks as they are downloaded,
+    close() for the extracted text. `text_chars` is the amount of header,
+    paragraph and list item text seen so far, to decide when a page has
+    given enough.
+
+    Args:
+        parser (str): 'lxml' or 'html.parser'; defaults to lxml when installed.
+        encoding (str): Charset from the Content-Type header, if any.
+    """
+
+    def __init__(self, parser=None, encoding=None):
+        if parser is None or lxml is None:
+            parser = 'lxml' if lxml is not None else 'html.parser'
+
+        self.collector = _Collector()
+        self._decoder = None
+        if parser == 'lxml':
+            target = _LxmlTarget(self.collector)
+            try:
+                self._parser = etree.HTMLParser(target=target, encoding=encoding)
+            except LookupError:
+                # Unknown charset: let libxml2 sniff it from the page
+                self._parser = etree.HTMLParser(target=target)
+        else:
+            self._parser = _EventParser(self.collector)
+            self._decoder = codecs.getincrementaldecoder(_codec(encoding))(errors='replace')
+
+    @property
+    def text_chars(self):
+        return self.collector.text_chars
+
+    def feed(self, chunk):
+        if self._decoder is not None:
+            chunk = self._decoder.decode(chunk)
+        if chunk:
+            self._parser.feed(chunk)
+
+    def close(self):
+        if self._decoder is not None:
+            self._parser.feed(self._decoder.decode(b'', final=True))
+            self._parser.close()
+        else:
+            try:
+                self._parser.close()
+            except etree.XMLSyntaxError:
+                pass  # Nothing was fed (empty body)
+        return self.collector.finish()
+
+
+def _codec(encoding):
+    try:
+        return codecs.lookup(encoding).name
+    except (LookupError, TypeError):
+        return 'utf-8'
+
+
+def extract_text(html, parser=None):
+    """
+    Extracts structured content from an HTML document with focus on headers and main text.
+
+    Args:
+        html (str | bytes): The raw HTML of the webpage.
+        parser (str): 'lxml' or 'html.parser'; defaults to lxml when installed.
+
+    Returns:
+        str: Headers (as markdown style `#` lines), then paragraph / list item
+        text, then the text of substantial divs, deduplicated.
+    """
+    if parser is None or lxml is None:
+        parser = 'lxml' if lxml is not None else 'html.parser'
+
+    collector = _Collector()
+    if parser == 'lxml':
+        _walk_lxml(html, collector)
+    else:
+        _walk_stdlib(html, collector)
+    return collector.finish()
@@ -0,0 +1,173 @@
+# fetch.py
+"""
+Bounded downloads of pages to scrape.
+
+The body is streamed straight into the extractor instead of being read into
+memory first. Reading stops at SCRAPE_MAX_BYTES, or as soon as
+SCRAPE_TEXT_TARGET characters of text were found, and non-HTML responses
+(PDFs, images, media streams) are rejected from their headers alone.
+
+Extracted text is kept in the page cache (page_cache.py); counters
+`page_cache.hit` (fresh, no request), `page_cache.revalidated` (304) and
+`page_cache.miss`.
+"""
+import logging
+import re
+import time
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from . import metrics, outbound
+from .extraction import StreamExtractor
+from .page_cache import page_cache
+
+logger = logging.getLogger(__name__)
+
+SCRAPE_MAX_BYTES = getattr(settings, 'SCRAPE_MAX_BYTES', 5 * 1024 * 1024)
+SCRAPE_TEXT_TARGET = getattr(settings, 'SCRAPE_TEXT_TARGET', 100000)
+SCRAPE_TIMEOUT = outbound.timeout(read=getattr(settings, 'SCRAPE_TIMEOUT', 10))
+SCRAPE_CHUNK_SIZE = 64 * 1024
+SCRAPE_USE_PROXIES = getattr(settings, 'SCRAPE_USE_PROXIES', False)
+
+# Browser-like headers for outbound page fetches
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+HTML_CONTENT_TYPES = {'text/html', 'application/xhtml+xml'}
+
+
+class FetchFailed(RuntimeError):
+    """A page or transcript could not be downloaded (network, upstream down); worth a retry."""
+
+
+class PageDownload:
+    """
+    Feeds one streamed response body to a StreamExtractor.
+
+    Counters: `fetch.pages`, `fetch.bytes`, `fetch.ttfb_ms` (summed per page),
+    `fetch.rejected` for non-HTML responses, `fetch.cutoff` when enough text
+    was found early and `fetch.truncated` when the byte cap was hit.
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.started = time.monotonic()
+        self.ttfb = None
+        self.bytes_read = 0
+        self.stopped = None
+        self.extractor = None
+        self.headers = {}
+
+    def accept(self, headers):
+        """Check the response headers; False for content that isn't HTML."""
+        self.headers = headers
+        content_type, _, params = headers.get('Content-Type', '').partition(';')
+        content_type = content_type.strip().lower()
+        if content_type and content_type not in HTML_CONTENT_TYPES:
+            logger.warning(f"Skipping non-HTML page ({content_type}): {self.url}")
+            metrics.incr('fetch.rejected')
+            return False
+
+        charset = re.search(r'charset=["\']?([\w.:-]+)', params, re.IGNORECASE)
+        self.extractor = StreamExtractor(encoding=charset.group(1) if charset else None)
+        return True
+
+    def feed(self, chunk):
+        """Parse one body chunk. Returns False once reading should stop."""
+        if self.ttfb is None:
+            self.ttfb = time.monotonic() - self.started
+
+        chunk = chunk[:SCRAPE_MAX_BYTES - self.bytes_read]
+        self.bytes_read += len(chunk)
+        self.extractor.feed(chunk)
+
+        if self.bytes_read >= SCRAPE_MAX_BYTES:
+            self.stopped = 'truncated'
+        elif self.extractor.text_chars >= SCRAPE_TEXT_TARGET:
+            self.stopped = 'cutoff'
+        return self.stopped is None
+
+    def finish(self):
+        text = self.extractor.close()
+
+        ttfb_ms = int((self.ttfb or 0) * 1000)
+        metrics.incr('fetch.pages')
+        metrics.incr('fetch.bytes', self.bytes_read)
+        metrics.incr('fetch.ttfb_ms', ttfb_ms)
+        if self.stopped:
+            metrics.incr(f'fetch.{self.stopped}')
+        logger.info(f"Fetched {self.url}: {self.bytes_read} bytes, ttfb {ttfb_ms}ms, "
+                    f"stopped: {self.stopped or 'end of body'}")
+        return text
+
+
+def _revalidated(url, entry, response):
+    metrics.incr('page_cache.revalidated')
+    page_cache.refresh(url, entry, response.headers)
+    return entry['text']
+
+
+def _finish(url, download):
+    text = download.finish()
+    metrics.incr('page_cache.miss')
+    page_cache.put(url, text, download.headers)
+    return text
+
+
+def read_page(url):
+    """Download `url` within the limits above and return its extracted text."""
+    entry = page_cache.get(url)
+    if entry and page_cache.is_fresh(entry):
+        metrics.incr('page_cache.hit')
+        return entry['text']
+
+    download = PageDownload(url)
+    headers = {**SCRAPE_HEADERS, **page_cache.conditional_headers(entry)}
+    try:
+        with outbound.stream('GET', url, headers=headers, timeout=SCRAPE_TIMEOUT,
+                             use_proxy=SCRAPE_USE_PROXIES) as response:
+            if response.status_code == 304 and entry:
+                return _revalidated(url, entry, response)
+            response.raise_for_status()
+            if not download.accept(response.headers):
+                return ""
+            for chunk in response.iter_bytes(SCRAPE_CHUNK_SIZE):
+                if not download.feed(chunk):
+                    break
+
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        logger.error(f"Failed to retrieve webpage: {e}")
+        return ""
+
+    return _finish(url, download)
+
+
+async def aread_page(url):
+    """Async counterpart of read_page()."""
+    entry = await sync_to_async(page_cache.get, thread_sensitive=False)(url)
+    if entry and page_cache.is_fresh(entry):
+        metrics.incr('page_cache.hit')
+        return entry['text']
+
+    download = PageDownload(url)
+    headers = {**SCRAPE_HEADERS, **page_cache.conditional_headers(entry)}
+    # Parsing and cache files are blocking, run them in a thread
+    feed = sync_to_async(download.feed, thread_sensitive=False)
+    try:
+        async with outbound.astream('GET', url, headers=headers, timeout=SCRAPE_TIMEOUT,
+                                    use_proxy=SCRAPE_USE_PROXIES) as response:
+            if response.status_code == 304 and entry:
+                return await sync_to_async(_revalidated, thread_sensitive=False)(url, entry, response)
+            response.raise_for_status()
+            if not download.accept(response.headers):
+                return ""
+            async for chunk in response.aiter_bytes(SCRAPE_CHUNK_SIZE):
+                if not await feed(chunk):
+                    break
+
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        logger.error(f"Failed to retrieve webpage: {e}")
+        return ""
+
+    return await sync_to_async(_finish, thread_sensitive=False)(url, download)
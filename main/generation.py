@@ -0,0 +1,751 @@
+# generation.py
+import asyncio
+import json
+import re
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from . import llm, metrics
+from .singleflight import SingleFlight
+from .ttl_cache import build_cache
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Upper bound on how much scraped / transcript text goes into one prompt
+MAX_SOURCE_CHARS = getattr(settings, 'GENERATION_MAX_SOURCE_CHARS', 60000)
+
+# Map-reduce source reduction: sources over SOURCE_TOKEN_BUDGET are split into
+# SOURCE_CHUNK_TOKENS chunks whose key points are extracted in parallel
+CHARS_PER_TOKEN = 4
+SOURCE_TOKEN_BUDGET = getattr(settings, 'SOURCE_TOKEN_BUDGET', 6000)
+SOURCE_CHUNK_TOKENS = getattr(settings, 'SOURCE_CHUNK_TOKENS', 4000)
+SOURCE_MAP_CONCURRENCY = getattr(settings, 'SOURCE_MAP_CONCURRENCY', 6)
+MAX_REDUCE_ROUNDS = 2
+
+# Identical prompts in flight at the same time share one model call. Set
+# SINGLE_FLIGHT_CACHE_ALIAS to a shared cache to coalesce across workers too.
+llm_flights = SingleFlight('llm', alias=getattr(settings, 'SINGLE_FLIGHT_CACHE_ALIAS', None))
+
+# Topic ideas are "evergreen", so suggestions per (field, sub_field) are cached
+topics_cache = build_cache(
+    'topics',
+    ttl=getattr(settings, 'TOPICS_CACHE_TTL', 6 * 60 * 60),
+    stale_ttl=getattr(settings, 'TOPICS_CACHE_STALE_TTL', 24 * 60 * 60),
+    backend=getattr(settings, 'TOPICS_CACHE_BACKEND', 'local'),  # 'local' or 'django'
+    max_size=getattr(settings, 'TOPICS_CACHE_MAX_SIZE', 512),
+)
+
+
+def extract_json(text):
+    try:
+        # Find JSON inside possible Markdown-style AI response
+        match = re.search(r'```json\s*({.*?})\s*```', text, re.DOTALL)
+        if match:
+            text = match.group(1)  # Extract only the JSON part
+        
+        # Remove any unwanted characters before/after JSON
+        text = text.strip().strip('`')
+
+        return json.loads(text)  # Convert to dictionary
+    except Exception as e:
+        raise ValueError("Invalid JSON format")
+
+
+def generate(prompt):
+    """
+    Send a single, self-contained prompt to the model and return its text.
+
+    No chat history is kept between calls, so every request costs only its
+    own prompt no matter how many requests the worker has already served.
+    """
+    return llm_flights.do(SingleFlight.key(prompt), lambda: llm.get_client().generate(prompt))
+
+
+async def agenerate(prompt):
+    """
+    Async counterpart of generate() for the ASGI views: awaits the model
+    without holding a thread for the whole round trip.
+    """
+    return await llm_flights.ado(SingleFlight.key(prompt), lambda: llm.get_client().agenerate(prompt))
+
+
+async def agenerate_json(prompt):
+    return extract_json(await agenerate(prompt))
+
+
+def generate_stream(prompt):
+    """
+    Stream the model's response, yielding text chunks as they arrive.
+    """
+    return llm.get_client().generate_stream(prompt)
+
+
+def generate_json(prompt):
+    """Generate a response and parse the JSON object out of it."""
+    return extract_json(generate(prompt))
+
+
+def normalize_key(*parts):
+    """Case and whitespace insensitive cache key"""
+    return '|'.join(' '.join(str(part or '').lower().split()) for part in parts)
+
+
+def suggest_topics(field, sub_field):
+    """Topic suggestions for a field, served from topics_cache when possible."""
+    prompt = topics_prompt(field, sub_field)
+    return topics_cache.get_or_compute(
+        normalize_key(field, sub_field), lambda: generate_json(prompt)['topics'])
+
+
+async def asuggest_topics(field, sub_field):
+    prompt = topics_prompt(field, sub_field)
+
+    async def compute():
+        return (await agenerate_json(prompt))['topics']
+
+    return await topics_cache.aget_or_compute(normalize_key(field, sub_field), compute)
+
+
+def clip_source(text, limit=None):
+    """Bound source material (transcripts, scraped pages) to `limit` characters."""
+    limit = limit or MAX_SOURCE_CHARS
+    if len(text) <= limit:
+        return text
+    return text[:limit]
+
+
+def clean_content(content):
+    """Strip the [placeholder] brackets the model sometimes leaves behind."""
+    return content.replace('[', '').replace(']', '')
+
+
+def summarize_text(text, summary_length=200):
+    """
+    Summarizes the input text by selecting sentences from the beginning, middle, and end.
+
+    Args:
+        text (str): The input text to summarize.
+        summary_length (int): The number of sentences to include in the summary.
+
+    Returns:
+        str: The summarized text.
+    """
+    try:
+        # Split the text into sentences (assuming sentences are separated by '. ')
+        sentences = text.split(". ")
+
+        # Remove empty strings from the list
+        sentences = [s.strip() for s in sentences if s.strip()]
+
+        # If there are fewer sentences than the requested summary length, return all sentences
+        if len(sentences) <= summary_length:
+            return ". ".join(sentences) + "."
+
+        # Calculate the step size to evenly distribute sentences
+        step = len(sentences) // summary_length
+
+        # Select sentences from the beginning, middle, and end
+        summary_sentences = []
+        for i in range(summary_length):
+            index = min(
+                i * step, len(sentences) - 1
+            )  # Ensure we don't go out of bounds
+            summary_sentences.append(sentences[index])
+
+        # Join the selected sentences into a summary
+        summary = ". ".join(summary_sentences) + "."
+
+        return summary
+
+    except Exception as e:
+        logger.error(f"Error in summarize_text: {e}")
+        return False
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 characters per token) used for prompt budgeting."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def split_chunks(text, max_tokens):
+    """
+    Split text into chunks of at most `max_tokens` (estimated), breaking on
+    sentence / line boundaries where possible.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    size = 0
+
+    for piece in re.split(r'(?<=[.!?\n])\s+', text):
+        # A single "sentence" longer than a chunk (e.g. unpunctuated transcripts)
+        while len(piece) > max_chars:
+            if current:
+                chunks.append(' '.join(current))
+                current, size = [], 0
+            chunks.append(piece[:max_chars])
+            piece = piece[max_chars:]
+
+        if current and size + len(piece) > max_chars:
+            chunks.append(' '.join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 1
+
+    if current:
+        chunks.append(' '.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _keypoints_text(keypoints):
+    if isinstance(keypoints, list):
+        return '\n'.join(str(point) for point in keypoints)
+    return str(keypoints)
+
+
+def get_keypoints(source):
+    generated_data = generate_json(keypoints_prompt(source))
+
+    return _keypoints_text(generated_data['keypoints'])
+
+
+async def aget_keypoints(source):
+    generated_data = await agenerate_json(keypoints_prompt(source))
+
+    return _keypoints_text(generated_data['keypoints'])
+
+
+def _chunk_fallback(chunk, error):
+    # Keep an extractive sample of the chunk rather than dropping it
+    logger.warning(f"Key point extraction failed, using extractive summary: {error}")
+    return summarize_text(chunk, summary_length=10) or ''
+
+
+def _finish_reduction(original, reduced, budget):
+    metrics.incr('source.reduced')
+    metrics.incr('source.tokens_in', estimate_tokens(original))
+    metrics.incr('source.tokens_out', estimate_tokens(reduced))
+    return clip_source(reduced, budget * CHARS_PER_TOKEN)
+
+
+def reduce_source(text, budget=None):
+    """
+    Condense long source material (transcripts, scraped pages) to fit the
+    token budget of the final post prompt.
+
+    Map: the text is split into SOURCE_CHUNK_TOKENS chunks whose key points
+    are extracted in parallel. Reduce: the key points are joined, and
+    condensed again if they still exceed the budget.
+    """
+    budget = budget or SOURCE_TOKEN_BUDGET
+    if not isinstance(text, str) or estimate_tokens(text) <= budget:
+        return text
+
+    reduced = text
+    for _ in range(MAX_REDUCE_ROUNDS):
+        chunks = split_chunks(reduced, SOURCE_CHUNK_TOKENS)
+
+        def extract(chunk):
+            try:
+                return get_keypoints(chunk)
+            except Exception as e:
+                return _chunk_fallback(chunk, e)
+
+        with ThreadPoolExecutor(max_workers=min(SOURCE_MAP_CONCURRENCY, len(chunks))) as executor:
+            reduced = '\n'.join(points for points in executor.map(extract, chunks) if points)
+
+        if estimate_tokens(reduced) <= budget:
+            break
+
+    return _finish_reduction(text, reduced, budget)
+
+
+async def areduce_source(text, budget=None):
+    """Async counterpart of reduce_source()."""
+    budget = budget or SOURCE_TOKEN_BUDGET
+    if not isinstance(text, str) or estimate_tokens(text) <= budget:
+        return text
+
+    semaphore = asyncio.Semaphore(SOURCE_MAP_CONCURRENCY)
+
+    async def extract(chunk):
+        async with semaphore:
+            try:
+                return await aget_keypoints(chunk)
+            except Exception as e:
+                return _chunk_fallback(chunk, e)
+
+    reduced = text
+    for _ in range(MAX_REDUCE_ROUNDS):
+        chunks = split_chunks(reduced, SOURCE_CHUNK_TOKENS)
+        points = await asyncio.gather(*(extract(chunk) for chunk in chunks))
+        reduced = '\n'.join(p for p in points if p)
+
+        if estimate_tokens(reduced) <= budget:
+            break
+
+    return _finish_reduction(text, reduced, budget)
+
+
+s_prompt = '''
+# LINKEDIN POST GUIDE: REAL & ENGAGING FORMATS
+
+## MAIN IDEAS
+- Share real value in every post
+- Mix up how your posts look
+- Stick to one main point per post
+- Write like you talk, but keep it professional
+- Ask real questions people want to answer
+
+HOOK eg (Ads are not Marketing, AI is changing fast, Deepseek Vs Gpt, 3 Marketing Mistakes you should avoid, Will Brics take Over?)
+
+NOTE: THE START OF EVERY POST MUST BE LIKE THIS (
+[Hook(max 7 words) start with Capital letter then the rest small letters]
+empty(new line (empty space))
+[next transition text (max 5 words)]
+empty(new line (empty space))
+)
+
+CORE MESSAGE STYLES (Pick 1-2)
+A. Value Proposition
+"The reality? [Honest assessment].
+
+The approach that works? ⬇️"
+
+B. Experience-Based Framework
+*"What I've learned about [topic]:
+[Element 1] → [Real outcome]
+↳ [Practical application]
+[Element 2] → [Observed pattern]
+↳ [Implementation insight]"*
+C. Transformation Story
+"[Time frame] of focused effort:
+[Starting point]? [Current reality].
+[Initial challenge]? [Solution found]."
+
+## POST LAYOUTS (Choose what fits your message)
+
+### 1. ARROW FORMAT (For showing cause-effect eg: How Meditation Boosts Creativity)
+```
+DECISION FATIGUE IS REAL
+
+Three shifts that changed everything for me:
+
+Clear mind → Better choices
+↳ Make big decisions before lunch
+↳ Create simple systems for small choices
+<line_break here>
+Short breaks → Fresh thinking
+↳ Take 10 minutes between meetings
+↳ Change your space to reset your mind
+<line_break here>
+Energy planning → Staying focused
+↳ Protect your best hours
+↳ Work with your natural ups and downs
+<line_break here>
+Your biggest choices deserve your best thinking.
+<line_break here>
+How do you stay fresh when making tough calls?
+```
+
+### 2. NUMBERED LIST FORMAT (Only use if the post topic is like this eg. [x] things to do))
+```
+5 WAYS TO DELEGATE BETTER
+<line_break here>
+That actually help your team grow:
+<line_break here>
+1. Start with why
+   Share the reason, not just the task
+   Help people see the bigger picture
+<line_break here>
+2. Match tasks to people
+   Play to strengths
+   Think about growth, not just skills
+<line_break here>
+3. Clear goals, open paths
+   Define what success looks like
+   Let people find their own way there
+<line_break here>
+4. Help without taking over
+   Be there when needed
+   Provide tools, not rescues
+<line_break here>
+5. Celebrate growth
+   Notice the learning
+   Praise progress, not just results
+<line_break here>
+Good delegation isn't about doing less—it's about growing others.
+<line_break here>
+What's your hardest part of delegating? I'm curious.
+```
+
+### 3. THIS vs. THAT FORMAT (Compares two ideas (e.g., "Remote work vs. Office work"))
+```
+PRODUCTIVITY MYTHS
+<line_break here>
+What doesn't work vs. What does:
+<line_break here>
+To-do lists vs. Focus blocks
+- Lists feel busy but don't finish things
+- Blocks make sure the big stuff gets done
+<line_break here>
+Clock-watching vs. Energy planning
+- Tracking hours drains creativity
+- Working with your energy creates flow
+<line_break here>
+Doing many things vs. Deep work
+- Switching tasks wastes nearly half your time
+- Focused blocks get real results
+<line_break here>
+The best system is the one you'll actually stick with.
+<line_break here>
+What unusual method has helped your productivity?
+```
+
+### 4. STORY FORMAT (for personal lessons (e.g., "How I overcame procrastination"))
+```
+HOW I BEAT BURNOUT
+<line_break here>
+My journey in 3 parts:
+<line_break here>
+PART 1: The breaking point
+• Working nights and weekends became normal
+• Always on my phone, always tired
+• Using caffeine instead of rest
+<line_break here>
+PART 2: The wake-up call
+• Realized more hours ≠ better work
+• Found my best ideas come when I'm fresh
+• Learned that rest makes me more productive
+<line_break here>
+PART 3: The new way
+• Set firm cutoff times
+• Told my team when I'm available
+• Built rest into my schedule
+<line_break here>
+This change wasn't quick, but it was worth it.
+<line_break here>
+What boundary has helped your work life the most?
+```
+
+### 5. PROBLEM-SOLUTION FORMAT (For common challenges e.g., "Why people fail at diets and how to succeed")
+```
+WHY FEEDBACK FAILS
+<line_break here>
+And how to fix it:
+<line_break here>
+PROBLEM: Too vague
+"Good job" without details
+Leaves room for confusion
+<line_break here>
+FIX: Be specific
+Point to exact actions
+Connect what they did to what happened
+<line_break here>
+PROBLEM: Bad timing
+Waiting for review season
+Saving up issues until they're huge
+<line_break here>
+FIX: Regular check-ins
+Short, casual feedback often
+Talk while things are still fresh
+<line_break here>
+PROBLEM: All criticism, no help
+Pointing out what's wrong
+Making people defensive
+<line_break here>
+FIX: Guide, don't just judge
+For every problem, offer a next step
+Focus on growth, not just fixing
+
+What's your best tip for giving helpful feedback?
+```
+
+### 6. ARROW INSIGHT FORMAT (For expert advice e.g. "Top productivity hacks")
+```
+NEGOTIATION SECRETS
+<line_break here>
+After hundreds of deals, here's what works:
+<line_break here>
+Homework → Confidence
+↳ Most wins happen before you show up
+↳ Know when you'll walk away
+<line_break here>
+Questions → Finding value
+↳ Asking reveals what matters
+↳ Understanding needs uncovers hidden wins
+<line_break here>
+Patience → Better deals
+↳ Being OK with silence gets better terms
+↳ Rushing looks desperate
+<line_break here>
+The best negotiators listen more than they talk.
+<line_break here>
+What's your go-to negotiation trick?
+```
+
+### 7. BULLET POINT FORMAT (For quick tips eg Habits for sharper focus)
+```
+BETTER MEETINGS
+
+Three changes that cut our meeting time in half:
+<line_break here>
+• Start with a clear goal
+  Know what success looks like before you begin
+<line_break here>
+• Send prep work early
+  Good homework leads to good talk time
+<line_break here>
+• Create, then evaluate
+  Don't judge ideas while they're still forming
+<line_break here>
+These simple shifts saved us hours while getting better results.
+<line_break here>
+Which one would help your meetings the most?
+```
+
+### 8. PLAIN TEXT STORY (For personal reflections)
+```
+THE ADVICE I WISH I'D GOTTEN EARLIER
+
+I was stuck. Working hard but not feeling right about it.
+
+Everyone told me: work harder, meet more people, learn new skills.
+
+It all made sense, but nothing changed.
+<line_break here>
+Then someone asked me something different: "What problems do you actually enjoy solving?"
+
+Not what I was good at. Not what paid well. But what energized me even when it was hard.
+
+That question changed everything.
+
+I realized I was climbing the wrong ladder. Good at work that drained me instead of filling me up.
+
+The change wasn't overnight, but that question started me on a new path.
+
+Now I ask everyone I mentor the same thing.
+
+What problems do you actually enjoy solving?
+```
+
+## WAYS TO END YOUR POST
+
+### QUESTIONS TO ASK
+```
+What's been your experience with this?
+```
+
+```
+Which of these ideas clicks most with you?
+```
+
+```
+How have you handled this in your work?
+```
+
+```
+What would you add based on your experience?
+```
+
+### INVITATIONS TO ACT
+```
+Try just one of these ideas this week. I'd love to hear what happens.
+```
+
+```
+Think about which of these patterns might be showing up in your team.
+```
+
+```
+Share your biggest takeaway if this sparked any new thoughts.
+```
+
+### THOUGHTFUL ENDINGS
+```
+Take a moment: Which of these shows up most in your work?
+```
+
+```
+Think about your last tough project: Which idea here could have helped?
+```
+
+```
+Consider where you might be following the crowd when a different approach could work better.
+```
+RULES:
+
+Vary your approach between posts to maintain freshness
+Content before format - ensure valuable insights drive each section
+Use ↳ with four leading spaces for visual indentation (4 SPACES)
+Related lines should not have any space between them
+Focus on genuine experiences and practical wisdom
+Avoid industry jargon and buzzwords
+Write conversationally but professionally
+Each post should deliver one clear, valuable insight
+Replace ALL [brackets] with appropriate text
+Test for authenticity: Would you share this advice one-on-one?
+
+## KEEPING IT REAL
+- Write what you know, not just theories
+- Include real examples that show you've been there
+- Share practical wisdom, not generic advice
+- Ask yourself: "Would I say this to someone face-to-face?"
+- Focus on helping, not going viral
+
+Write a compelling social media post in an engaging and concise format. The post should:
+
+Start with a bold short (max 5 words), thought-provoking statement or question.
+Follow with a short transition sentence that builds intrigue (max 5 words).
+Present a numbered or bulleted list of key points with brief explanations (WHEN NEEDED).
+End with a strong conclusion, takeaway, or call to action.
+NOTE: HOOK SHOULD NOT BE MORE THAN 8 WORDS AND SHOULD BE SCROLL STOPPING
+NOTE: IT MUST SOUND HUMAN NOT LIKE AI
+NOTE: THE POST MUST BE LIKE HUMAN WRITING SO NO GIMICKY WORDS OR PHRASES
+NOTE: USE NATURAL LANGUAGE MAKE THE POST ENJOYABLE AND HAS ELEMENTS THAT WILL MAKE READERS READ TO THE END
+NOTE: ADD SOME PERSONAL CONTEXT / STORY IN THE POST
+NOTE: ALSO YOU CAN ASK SOME QUESTIONS TO THE READERS CAUSING THEM TO THINK BUT BE NATURAL
+NOTE: THE SECOND LINE OR SENTENCE SHOULD NOT BE TOO LONG MAX 7 WORDS AND SHOULD GRAB ATTENTION
+NOTE: THE POST MUST HAVE ALOT OF CONTEXT NOT VERY SHORT WITH NO CONTEXT
+NOTE: THE FIRST AND SECOND LINE NO MORE THAN 58WORDS
+NOTE: NO BOLDED TEXT NO <B>, <STRONG> TAGS
+NOTE: THE THIRD SENTENCE SHOULD BE SHORT MAX (6 WORDS)
+'''
+
+
+def text_post_prompt(topic, tone):
+    return f"""
+        {s_prompt}
+        Ensure the tone is authoritative yet conversational. The topic should be {topic}, and the post should be formatted similarly to the examples provided also with easy to understand words.
+        Tone: {tone}
+        NOTE: NO hashtags
+        NOTE: THE CONTENT SHOULD BE THE LINKEDIN POST EACH PARAGRAPH SHOULD BE A <p> TAG AND EACH PARAGRAPH SHOULD HAVE A <br> SPACE BEWEEN THEM
+        NOTE: only <p> and <br> should be used
+        NOTE: MIN LENGTH (90 WORDS) MAX LENGTH (190) words
+        ALLOWED TAGS = [P, BR]
+        
+        Return JSON format with these keys: 
+        ```json{{
+            "title": "string should be short max 4 words",
+            "content": "html string only <p> and <br> tags",
+            "length": "integer"
+        }}```
+        """
+
+
+def youtube_post_prompt(transcript, tone):
+    return f"""
+        {s_prompt}
+        Ensure the tone is authoritative yet conversational. This is the Youtube Video Transcript: {clip_source(transcript)}, and the post should be formatted similarly to the examples provided also with easy to understand words.
+        NOTE: THE PST MUST CONTAIN KEY POINTS FROM THE YOUTUBE VIDEO
+        Tone: {tone}
+        NOTE: NO hashtags
+        NOTE: THE CONTENT SHOULD BE THE LINKEDIN POST EACH PARAGRAPH SHOULD BE A <p> TAG AND EACH PARAGRAPH SHOULD HAVE A <br> SPACE BEWEEN THEM
+        NOTE: only <p> and <br> should be used no other tag
+        NOTE: MAX LENGTH OF 300 words
+        ALLOWED TAGS = [P, BR]
+        NOTE: NO BOLD TAGS <b> or <strong> or any other text formatting tags
+        
+        NOTE: STRICTLY Return JSON format with these keys: 
+        ```json{{
+            "title": "string",
+            "content": "html string <p> and <br> tags",
+            "length": "integer"
+        }}```
+        """
+
+
+def url_post_prompt(text, tone):
+    return f"""
+        {s_prompt}
+        Ensure the tone is authoritative yet conversational. This is the raw data: {clip_source(text)}, and the post should be formatted similarly to the examples provided also with easy to understand words.
+        Tone: {tone}
+        NOTE: NO hashtags
+        NOTE: THE CONTENT SHOULD BE THE LINKEDIN POST EACH PARAGRAPH SHOULD BE A <p> TAG AND EACH PARAGRAPH SHOULD HAVE A <br> SPACE BEWEEN THEM
+        NOTE: only <p> and <br> should be used no other tag
+        NOTE: MAX LENGTH OF 300 words
+        ALLOWED TAGS = [P, BR]
+        NOTE: NO BOLD TAGS <b> or <strong> or any other text formatting tags
+        
+        Return JSON format with these keys: 
+        ```json{{
+            "title": "string",
+            "content": "html string <p> and <br> tags",
+            "length": "integer"
+        }}```
+        """
+
+
+def regenerate_prompt(title, content):
+    return f"""
+        Improve and regenerate this LinkedIn post while maintaining its core message and Layout:
+
+        NOTE: NO BOLDED TEXT
+        Ensure the tone should not chnage yet conversational. The original Title is {title} original content: {content}, and the post should be formatted similarly to the examples provided also with easy to understand words.
+        NOTE: NO hashtags
+        NOTE: THE CONTENT SHOULD BE THE LINKEDIN POST EACH PARAGRAPH SHOULD BE A <p> TAG AND EACH PARAGRAPH SHOULD HAVE A <br> SPACE BEWEEN THEM
+        NOTE: only <p> and <br> should be used no other tag
+        NOTE: MAX LENGTH OF 300 words
+        ALLOWED TAGS = [P, BR]
+        NOTE: NO BOLD TAGS <b> or <strong> or any other text formatting tags in the response
+        NOTE: THE CTA SHOULD NEVER CHANGE IT SHOULD BE THE SAME
+        
+        Return JSON format with these keys: 
+        ```json{{
+            "title": "string max 5 words",
+            "content": "html string only <p> and <br> tags",
+            "length": "integer"
+        }}```
+        """
+
+
+def topics_prompt(field, sub_field):
+    return f"""
+        Generate 3 evergreen content ideas for {field}/{sub_field} that combine timeless value with viral potential. For each idea:
+        - Focus on fundamental questions/problems people always search
+        - Include psychological triggers for sharing (curiosity, emotion, surprise)
+        - Avoid time-sensitive references
+        - Prioritize titles that work across platforms
+        - Virality score (50-100) should reflect both shareability and search demand
+
+        Response should be in this format:
+            ```json{{
+                "topics": [
+                    {{"name": "title", "virality": 50 - 100}},
+                    {{"name": "title", "virality": 50 - 100}},
+                    {{"name": "title", "virality": 50 - 100}}
+                ]
+            }}```
+        """
+
+
+def edit_prompt(content, prompt_text):
+    prompt = f'''
+        MAKE EDIT TO THIS TEXT: {content}
+        EDIT: {prompt_text}
+        NOTE: IF HAS HTML TAGS IT SHOULD REMAIN THE SAME
+        NOTE: MAKE SURE THE RESPONSE SOUNDS HUMAN
+        NOTE: IF THE EDIT IS TO EDIT ONLY A PART ONLY EDIT THAT PART AND GIVE THE WHOLE TEXT WITH THE EDITED PART
+        NOTE: NO GIMICKS USE EASY TO UNDERTAND WORDS
+        NOTE: NO HASHTAGS UNLESS REQUESTED
+        NOTE: IF ASKED TO RESTRUCTURE THE RESPONSE IN A NICE FORMAT USING <p> and <br> tags only and maybe numberings and some icons
+
+        THE RESPONSE SHOULD BE IN THIS JSON FORMAT
+        ```json{{
+            "content": "result here (valid for json content)",
+            "length": "integer"
+            }}
+        ```
+    '''
+    return prompt.replace('<!---->', '')
+
+
+def keypoints_prompt(source):
+    return f'''
+        Analyze this text: {clip_source(source)} and give me the key points
+        NOTE: STRICTLY Return JSON format with these keys: 
+        ```json{{
+            "keypoints": "keypoints here",
+        }}```
+    '''
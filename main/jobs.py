@@ -0,0 +1,193 @@
+# jobs.py
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import httpx
+import requests
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from google.api_core import exceptions as google_exceptions
+from .fetch import FetchFailed
+from .llm import LLMUnavailable
+from .models import GenerationJob
+
+logger = logging.getLogger(__name__)
+
+# Bounded concurrency: at most this many LLM round trips per process
+MAX_WORKERS = getattr(settings, 'GENERATION_JOB_WORKERS', 4)
+MAX_ATTEMPTS = getattr(settings, 'GENERATION_JOB_MAX_ATTEMPTS', 3)
+RETRY_BASE_DELAY = getattr(settings, 'GENERATION_JOB_RETRY_DELAY', 2)  # seconds
+# A job still marked `running` after this long was orphaned by a dead worker
+STALE_AFTER = getattr(settings, 'GENERATION_JOB_STALE_AFTER', timedelta(minutes=10))
+# How often each process looks for orphaned / stuck jobs
+RECOVER_INTERVAL = getattr(settings, 'GENERATION_JOB_RECOVER_INTERVAL', 60)  # seconds
+
+# Failures worth retrying: network errors (httpx for pages and transcripts,
+# requests for the LLM HTTP backend), sources that could not be fetched,
+# overloaded/unavailable model and malformed model output (extract_json
+# raises ValueError)
+TRANSIENT_ERRORS = (
+    LLMUnavailable,
+    FetchFailed,
+    httpx.HTTPError,
+    requests.exceptions.RequestException,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    ValueError,
+)
+
+_handlers = {}
+_executor = None
+_executor_lock = threading.Lock()
+_recovery_started = False
+
+
+def register(kind):
+    """
+    Register the function that runs jobs of `kind`.
+
+    The handler is called with the GenerationJob and must return the Post it
+    created or updated.
+    """
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def wants_async(request):
+    return request.query_params.get('async') in ('1', 'true')
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=MAX_WORKERS, thread_name_prefix='generation-job')
+        return _executor
+
+
+def start(**kwargs):
+    """
+    Start this process's recovery loop, once. Connected to request_finished
+    by MainConfig.ready (the handlers, in views.py, are registered by then)
+    and called by submit().
+    """
+    global _recovery_started
+    if _recovery_started:
+        return
+    with _executor_lock:
+        if _recovery_started:
+            return
+        _recovery_started = True
+    threading.Thread(target=_recovery_loop, name='generation-job-recovery', daemon=True).start()
+
+
+def _recovery_loop():
+    initial = True
+    while True:
+        close_old_connections()
+        try:
+            _recover(all_queued=initial)
+            initial = False
+        except Exception as e:
+            logger.error(f"Generation job recovery failed: {e}")
+        finally:
+            close_old_connections()
+        time.sleep(RECOVER_INTERVAL)
+
+
+def _recover(all_queued=False):
+    """
+    Re-queue jobs orphaned by a crash or restart and schedule the waiting
+    ones: all of them when the process starts (their process may be gone,
+    with its pending retries), afterwards those untouched for STALE_AFTER.
+    Claiming is atomic, so several processes recovering the same jobs never
+    run one twice.
+    """
+    cutoff = timezone.now() - STALE_AFTER
+    jobs = GenerationJob.objects.filter(kind__in=list(_handlers))
+    orphaned = list(jobs.filter(status=GenerationJob.RUNNING, updated__lt=cutoff).values_list('id', flat=True))
+    if orphaned:
+        requeued = jobs.filter(pk__in=orphaned, status=GenerationJob.RUNNING, updated__lt=cutoff).update(
+            status=GenerationJob.QUEUED, updated=timezone.now())
+        logger.warning(f"Re-queued {requeued} orphaned generation jobs")
+
+    waiting = jobs.filter(status=GenerationJob.QUEUED)
+    if not all_queued:
+        waiting = waiting.filter(updated__lt=cutoff)
+    executor = _get_executor()
+    for job_id in {*orphaned, *waiting.values_list('id', flat=True)}:
+        executor.submit(_run, job_id)
+
+
+def submit(user, kind, payload):
+    """Persist a new job and hand it to the worker pool."""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    start()
+    job = GenerationJob.objects.create(user=user, kind=kind, payload=payload)
+    _get_executor().submit(_run, job.id)
+    return job
+
+
+def _claim(job_id):
+    return GenerationJob.objects.filter(pk=job_id, status=GenerationJob.QUEUED).update(
+        status=GenerationJob.RUNNING, attempts=F('attempts') + 1, updated=timezone.now()
+    ) == 1
+
+
+def _retry_later(job_id, attempts):
+    delay = RETRY_BASE_DELAY * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+    timer = threading.Timer(delay, lambda: _get_executor().submit(_run, job_id))
+    timer.daemon = True
+    timer.start()
+
+
+def _run(job_id):
+    close_old_connections()
+    try:
+        if not _claim(job_id):
+            return  # Already taken by another worker/process
+
+        job = GenerationJob.objects.select_related('user').get(pk=job_id)
+        try:
+            post = _handlers[job.kind](job)
+        except TRANSIENT_ERRORS as e:
+            if job.attempts < MAX_ATTEMPTS:
+                logger.warning(f"Generation job {job_id} attempt {job.attempts} failed: {e}")
+                GenerationJob.objects.filter(pk=job_id).update(
+                    status=GenerationJob.QUEUED, error=str(e), updated=timezone.now())
+                _retry_later(job_id, job.attempts)
+                return
+            _fail(job_id, e)
+            return
+        except Exception as e:
+            _fail(job_id, e)
+            return
+
+        GenerationJob.objects.filter(pk=job_id).update(
+            status=GenerationJob.DONE, post=post, error='', updated=timezone.now())
+    except Exception as e:
+        logger.error(f"Generation job {job_id} crashed: {e}")
+    finally:
+        close_old_connections()
+
+
+def _fail(job_id, error):
+    logger.error(f"Generation job {job_id} failed: {error}")
+    if isinstance(error, KeyError):
+        message = f'Missing required field: {str(error)}'
+    else:
+        message = str(error)
+    GenerationJob.objects.filter(pk=job_id).update(
+        status=GenerationJob.FAILED, error=message, updated=timezone.now())
@@ -0,0 +1,231 @@
+# llm.py
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+import httpx
+import requests
+from django.conf import settings
+
+
+class LLMUnavailable(Exception):
+    """The backend could not answer (overloaded, injected failure, 5xx)."""
+
+
+class LLMClient:
+    """
+    Interface the views depend on. Implementations return the raw model text;
+    JSON extraction stays in generation.py.
+    """
+
+    def generate(self, prompt):
+        raise NotImplementedError
+
+    async def agenerate(self, prompt):
+        raise NotImplementedError
+
+    def generate_stream(self, prompt):
+        """Yield text chunks as they are produced."""
+        raise NotImplementedError
+
+
+class GeminiClient(LLMClient):
+    # Configure Gemini 1.5 Flash
+    generation_config = {
+            "temperature": 1,
+            "top_p": 0.95,
+            "top_k": 64,
+            "max_output_tokens": 8000,
+            "response_mime_type": "text/plain",
+        }
+    model_name = "gemini-2.0-flash-thinking-exp-1219"
+
+    def __init__(self, api_key):
+        import google.generativeai as genai
+
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(
+            model_name=self.model_name,
+            generation_config=self.generation_config,
+        )
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+    async def agenerate(self, prompt):
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+    def generate_stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. safety or finish metadata)
+                continue
+            if text:
+                yield text
+
+
+class FakeClient(LLMClient):
+    """
+    Deterministic local stand-in for load tests and offline benchmarks.
+
+    Args:
+        latency (float): Seconds before the first token.
+        tokens_per_second (float): Output rate after the first token (0 = instant).
+        prefill_tokens_per_second (float): Prompt processing rate added to the
+            first-token latency, so bigger prompts answer slower (0 = ignore).
+        failure_rate (float): Fraction of calls raising LLMUnavailable.
+        malformed_rate (float): Fraction of calls returning truncated JSON.
+        seed (int): Seed for the failure / malformed draws.
+    """
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, latency=0.5, tokens_per_second=200, failure_rate=0.0,
+                 malformed_rate=0.0, seed=0, prefill_tokens_per_second=0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.prefill_tokens_per_second = prefill_tokens_per_second
+        self.failure_rate = failure_rate
+        self.malformed_rate = malformed_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            return self._random.random(), self._random.random()
+
+    def respond(self, prompt):
+        """Build the response text for `prompt`, or raise an injected failure."""
+        failure, malformed = self._draw()
+        if failure < self.failure_rate:
+            raise LLMUnavailable("Injected fake LLM failure")
+
+        digest = hashlib.sha1(prompt.encode()).hexdigest()
+        if '"topics"' in prompt:
+            data = {'topics': [{'name': f'Topic {digest[i:i + 6]}', 'virality': 50 + i * 10}
+                               for i in range(3)]}
+        elif '"keypoints"' in prompt:
+            data = {'keypoints': f'Key points {digest[:8]}'}
+        elif 'MAKE EDIT TO THIS TEXT' in prompt:
+            data = {'content': f'<p>Edited {digest[:8]}</p>', 'length': 20}
+        else:
+            paragraphs = ''.join(f'<p>Paragraph {n} {digest}</p><br>' for n in range(8))
+            data = {'title': f'Post {digest[:6]}', 'content': paragraphs, 'length': len(paragraphs)}
+
+        text = '```json\n' + json.dumps(data) + '\n```'
+        if malformed < self.malformed_rate:
+            text = text[:len(text) // 2]
+        return text
+
+    def _chunks(self, text):
+        size = self.CHARS_PER_TOKEN * 8
+        for i in range(0, len(text), size):
+            yield text[i:i + size]
+
+    def _chunk_delay(self, chunk):
+        if not self.tokens_per_second:
+            return 0
+        return len(chunk) / self.CHARS_PER_TOKEN / self.tokens_per_second
+
+    def _first_token_delay(self, prompt):
+        if not self.prefill_tokens_per_second:
+            return self.latency
+        return self.latency + len(prompt) / self.CHARS_PER_TOKEN / self.prefill_tokens_per_second
+
+    def generate(self, prompt):
+        return ''.join(self.generate_stream(prompt))
+
+    def generate_stream(self, prompt):
+        text = self.respond(prompt)
+        time.sleep(self._first_token_delay(prompt))
+        for chunk in self._chunks(text):
+            time.sleep(self._chunk_delay(chunk))
+            yield chunk
+
+    async def agenerate(self, prompt):
+        text = self.respond(prompt)
+        await asyncio.sleep(self._first_token_delay(prompt) + sum(self._chunk_delay(c) for c in self._chunks(text)))
+        return text
+
+
+class HTTPClient(LLMClient):
+    """
+    Talks to a model server over HTTP, e.g. `manage.py fake_llm_server`.
+
+    POST {url}/generate with {"prompt": ..., "stream": bool}. The full answer
+    comes back as {"text": ...}; streamed answers as plain text chunks.
+    """
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip('/') + '/generate'
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def _check(self, status_code):
+        if status_code >= 500:
+            raise LLMUnavailable(f"LLM server returned {status_code}")
+
+    def generate(self, prompt):
+        response = self.session.post(self.url, json={'prompt': prompt}, timeout=self.timeout)
+        self._check(response.status_code)
+        response.raise_for_status()
+        return response.json()['text']
+
+    async def agenerate(self, prompt):
+        async with httpx.AsyncClient(timeout=self.timeout) as client:
+            response = await client.post(self.url, json={'prompt': prompt})
+        self._check(response.status_code)
+        response.raise_for_status()
+        return response.json()['text']
+
+    def generate_stream(self, prompt):
+        with self.session.post(self.url, json={'prompt': prompt, 'stream': True},
+                               timeout=self.timeout, stream=True) as response:
+            self._check(response.status_code)
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                if chunk:
+                    yield chunk
+
+
+def fake_client_from_settings():
+    return FakeClient(
+        latency=settings.LLM_FAKE_LATENCY,
+        tokens_per_second=settings.LLM_FAKE_TOKENS_PER_SECOND,
+        failure_rate=settings.LLM_FAKE_FAILURE_RATE,
+        malformed_rate=settings.LLM_FAKE_MALFORMED_RATE,
+        seed=settings.LLM_FAKE_SEED,
+        prefill_tokens_per_second=settings.LLM_FAKE_PREFILL_TOKENS_PER_SECOND,
+    )
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide client selected by settings.LLM_BACKEND."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                backend = settings.LLM_BACKEND
+                if backend == 'gemini':
+                    _client = GeminiClient(settings.GEMINI_API_KEY)
+                elif backend == 'fake':
+                    _client = fake_client_from_settings()
+                elif backend == 'http':
+                    _client = HTTPClient(settings.LLM_HTTP_URL)
+                else:
+                    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+    return _client
+
+
+def set_client(client):
+    """Swap the active client (load tests, shell experiments)."""
+    global _client
+    _client = client
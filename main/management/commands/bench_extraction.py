@@ -0,0 +1,81 @@
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from bs4 import BeautifulSoup
+from django.core.management.base import BaseCommand
+from main import extraction
+
+
+def legacy_parse_content(html):
+    """The previous BeautifulSoup based extraction, kept as the baseline."""
+    soup = BeautifulSoup(html, "html.parser")
+    main_content = soup.find(['article', 'main', 'div.article', 'div.content']) or soup.body
+
+    content = []
+    for header in main_content.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+        content.append(f"\n{'#' * int(header.name[1])} {header.get_text(strip=True)}\n")
+    for paragraph in main_content.find_all(['p', 'li']):
+        text = paragraph.get_text(strip=True, separator=' ')
+        if text:
+            content.append(text)
+    for div in main_content.find_all('div'):
+        if len(div.get_text(strip=True)) > 100:
+            content.append(div.get_text(strip=True, separator=' '))
+
+    return '\n'.join(dict.fromkeys(content)).strip()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare parse + extract time and peak memory of the legacy "
+        "BeautifulSoup extraction against extraction.extract_text (lxml and "
+        "html.parser) on saved HTML pages."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Saved HTML pages')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per page and engine')
+
+    def engines(self):
+        engines = {'legacy-bs4': legacy_parse_content,
+                   'html.parser': lambda html: extraction.extract_text(html, parser='html.parser')}
+        if extraction.lxml is not None:
+            engines['lxml'] = lambda html: extraction.extract_text(html, parser='lxml')
+        return engines
+
+    def measure(self, fn, html, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn(html)
+            timings.append(time.perf_counter() - started)
+
+        tracemalloc.start()
+        fn(html)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return result, statistics.median(timings), peak
+
+    def handle(self, *args, **options):
+        engines = self.engines()
+        totals = {name: [0.0, 0] for name in engines}
+
+        self.stdout.write(f"{'file':<30} {'KB':>7} {'engine':<12} {'ms':>9} {'peak KB':>9} {'same':>5}")
+        for name in options['files']:
+            html = Path(name).read_bytes()
+            baseline = None
+            for engine, fn in engines.items():
+                result, seconds, peak = self.measure(fn, html, options['repeat'])
+                if baseline is None:
+                    baseline = result
+                totals[engine][0] += seconds
+                totals[engine][1] = max(totals[engine][1], peak)
+                self.stdout.write(
+                    f"{Path(name).name[:30]:<30} {len(html) / 1024:>7.0f} {engine:<12} "
+                    f"{seconds * 1000:>9.1f} {peak / 1024:>9.0f} {'yes' if result == baseline else 'no':>5}"
+                )
+
+        self.stdout.write('')
+        for engine, (seconds, peak) in totals.items():
+            self.stdout.write(f"{engine:<12} total {seconds * 1000:>9.1f} ms, max peak {peak / 1024:>7.0f} KB")
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+import httpx
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test a running server's generation endpoint and report throughput "
+        "and tail latency per concurrency level. Run the server with "
+        "LLM_BACKEND=http against `manage.py fake_llm_server` to measure offline, "
+        "e.g. sync gunicorn vs. uvicorn with ASYNC_VIEWS=true, and exempt the load "
+        "from the limits (ANTI_DDOS_EXEMPT=127.0.0.1 QUOTA_EXEMPT=<email>). Every "
+        "request gets its own topic, so single-flight can't coalesce them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api/posts/create-text/')
+        parser.add_argument('--email', required=True, help='User the requests are made as')
+        parser.add_argument('--concurrency', default='50,200,500',
+                            help='Comma separated concurrency levels')
+        parser.add_argument('--requests', type=int, default=1000,
+                            help='Requests per concurrency level')
+        parser.add_argument('--payload', default='{"topic": "Remote work", "tone": "casual"}')
+        parser.add_argument('--timeout', type=float, default=120)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(email=options['email'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user with email {options['email']}")
+
+        token = str(RefreshToken.for_user(user).access_token)
+        payload = json.loads(options['payload'])
+
+        self.stdout.write(f"{'conc':>6} {'ok':>6} {'err':>5} {'limit':>5} {'req/s':>8} "
+                          f"{'p50':>8} {'p95':>8} {'p99':>8}")
+        for level in [int(c) for c in options['concurrency'].split(',')]:
+            result = asyncio.run(self._run_level(
+                options['url'], token, payload, level, options['requests'], options['timeout']))
+            self.stdout.write(
+                f"{level:>6} {result['ok']:>6} {result['errors']:>5} {result['limited']:>5} "
+                f"{result['throughput']:>8.1f} {result['p50']:>8.3f} {result['p95']:>8.3f} {result['p99']:>8.3f}"
+            )
+            if result['failures']:
+                self.stdout.write(f"{'':>6} errors: "
+                                  + ', '.join(f'{k}: {v}' for k, v in result['failures'].most_common()))
+            if result['limited']:
+                self.stderr.write("Requests were rate limited (403) or over quota (429): start the server "
+                                  "with ANTI_DDOS_EXEMPT / QUOTA_EXEMPT set, the numbers above are not usable")
+
+    async def _run_level(self, url, token, payload, concurrency, total, timeout):
+        latencies = []
+        errors = limited = 0
+        failures = Counter()  # status code or exception name -> count
+        remaining = iter(range(total))
+
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(timeout=timeout, limits=limits,
+                                     headers={'Authorization': f'Bearer {token}'}) as client:
+            async def worker():
+                nonlocal errors, limited
+                for n in remaining:
+                    # A distinct prompt per request: identical ones would share one LLM call
+                    body = {**payload, 'topic': f"{payload.get('topic', '')} #{concurrency}-{n}"}
+                    start = time.perf_counter()
+                    try:
+                        response = await client.post(url, json=body)
+                        ok = response.status_code < 300
+                        limited += response.status_code in (403, 429)
+                        outcome = response.status_code
+                    except httpx.HTTPError as e:
+                        ok = False
+                        outcome = type(e).__name__
+                    if ok:
+                        latencies.append(time.perf_counter() - start)
+                    else:
+                        errors += 1
+                        failures[outcome] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            elapsed = time.perf_counter() - started
+
+        latencies.sort()
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+        return {
+            'ok': len(latencies),
+            'errors': errors,
+            'limited': limited,
+            'failures': failures,
+            'throughput': len(latencies) / elapsed if elapsed else 0.0,
+            'p50': statistics.median(latencies) if latencies else 0.0,
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+        }
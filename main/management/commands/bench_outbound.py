@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+from django.core.management.base import BaseCommand
+from main import metrics, outbound
+
+
+class _PageHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    body = b'<html><body><p>' + b'benchmark page ' * 500 + b'</p></body></html>'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare a fresh connection per request (the old bare requests.get) "
+        "with the pooled main.outbound client: throughput, connections opened, "
+        "reuse rate and handshake time. Starts a local keep-alive server unless "
+        "--url is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Target URL (default: local test server)')
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=8)
+
+    def _run(self, label, fetch, url, total, concurrency):
+        before = metrics.snapshot()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(lambda _: fetch(url), range(total)))
+        elapsed = time.perf_counter() - started
+
+        after = metrics.snapshot()
+        delta = {k: after.get(k, 0) - before.get(k, 0)
+                 for k in ('outbound.requests', 'outbound.connections', 'outbound.handshake_ms')}
+        sent = delta['outbound.requests'] or 1
+        self.stdout.write(
+            f"{label:<10} {total / elapsed:>8.0f} req/s  connections {delta['outbound.connections']:>5}  "
+            f"reuse {1 - delta['outbound.connections'] / sent:>6.1%}  "
+            f"handshake {delta['outbound.handshake_ms']:>6} ms"
+        )
+
+    def handle(self, *args, **options):
+        url = options['url']
+        server = None
+        if not url:
+            server = ThreadingHTTPServer(('127.0.0.1', 0), _PageHandler)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f'http://127.0.0.1:{server.server_port}/'
+
+        def fresh(url):
+            # New client per call: DNS + TCP (+ TLS) every time
+            with httpx.Client(timeout=outbound.timeout()) as client:
+                handshake = outbound._Handshake()
+                metrics.incr('outbound.requests')
+                client.get(url, extensions={'trace': handshake.trace})
+
+        try:
+            self._run('fresh', fresh, url, options['requests'], options['concurrency'])
+            self._run('pooled', outbound.get, url, options['requests'], options['concurrency'])
+        finally:
+            if server:
+                server.shutdown()
@@ -0,0 +1,120 @@
+import statistics
+import time
+from urllib.parse import parse_qs, urlsplit
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.pagination import Cursor
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from main.models import Post
+from main.search import search_posts
+from main.serializers import POST_LIST_FIELDS, PostListSerializer, PostSerializer
+from main.views import CustomPostPaginator, PostCursorPaginator, PostSearchPaginator, approximate_count
+
+User = get_user_model()
+
+BENCH_EMAIL = 'bench-post-list@example.com'
+# A typical generated post: a few paragraphs and a list, ~2.5 KB of HTML.
+# Each post also names one of 10 topics and one of 1000 projects, for search.
+CONTENT = ('<p>' + 'Consistency beats intensity when you are building an audience. ' * 8 + '</p>') * 4 + \
+    '<ul>' + '<li>Write every day, even a short note.</li>' * 6 + '</ul>'
+TOPICS = ['marketing', 'python', 'leadership', 'hiring', 'design',
+          'finance', 'writing', 'sales', 'product', 'security']
+SEARCHES = [('rare', 'project42'), ('topic', 'leadership'), ('common', 'consistency'),
+            ('phrase', 'python lessons')]
+
+
+def content(n):
+    return f'<h2>{TOPICS[n % len(TOPICS)]} lessons from project{n % 1000}</h2>' + CONTENT
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed one user with --posts posts (100k by default) and time post_list "
+        "pages at increasing depth with page numbers (COUNT + OFFSET) and with "
+        "cursors, the exact vs approximate total, and the size / time of a "
+        "page of full posts vs list cards, and the first page of searches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument('--depths', default='1,10,100,1000,10000', help='Comma separated page numbers')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def seed(self, count):
+        user = User.objects.filter(email=BENCH_EMAIL).first()
+        if user is None:
+            user = User.objects.create_user(username=BENCH_EMAIL, email=BENCH_EMAIL, password=None)
+        missing = count - Post.objects.filter(user=user).count()
+        for start in range(0, max(missing, 0), 5000):
+            Post.objects.bulk_create(
+                self.post(user, start + i) for i in range(min(5000, missing - start)))
+        return user
+
+    @staticmethod
+    def post(user, n):
+        post = Post(user=user, title=f'Post {n}', content=content(n))
+        post.length = len(post.content)
+        post.derive_text()
+        return post
+
+    def timed(self, fn, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        return statistics.median(timings) * 1000
+
+    def handle(self, *args, **options):
+        user = self.seed(options['posts'])
+        posts = Post.objects.filter(user=user).order_by('-created', '-id')
+        factory = APIRequestFactory()
+        page_size = CustomPostPaginator.page_size
+
+        def page_number(depth):
+            request = Request(factory.get('/api/posts/', {'page': depth}))
+            list(CustomPostPaginator().paginate_queryset(posts, request))
+
+        def cursor_request(depth):
+            if depth == 1:
+                return Request(factory.get('/api/posts/', {'cursor': ''}))
+            # Cursor as `next` of the previous page would carry it: the last row seen
+            last = posts.values_list('created', flat=True)[(depth - 1) * page_size - 1]
+            paginator = PostCursorPaginator()
+            paginator.base_url = 'http://testserver/api/posts/'
+            encoded = parse_qs(urlsplit(paginator.encode_cursor(Cursor(0, False, str(last)))).query)['cursor'][0]
+            return Request(factory.get('/api/posts/', {'cursor': encoded}))
+
+        self.stdout.write(f"{options['posts']} posts, {page_size} per page")
+        self.stdout.write(f"{'page':>8} {'page-number ms':>15} {'cursor ms':>10}")
+        for depth in [int(d) for d in options['depths'].split(',')]:
+            if (depth - 1) * page_size >= options['posts']:
+                continue
+            request = cursor_request(depth)
+            by_number = self.timed(lambda: page_number(depth), options['repeat'])
+            by_cursor = self.timed(lambda: list(PostCursorPaginator().paginate_queryset(posts, request)),
+                                   options['repeat'])
+            self.stdout.write(f"{depth:>8} {by_number:>15.2f} {by_cursor:>10.2f}")
+
+        exact = self.timed(lambda: posts.count(), options['repeat'])
+        approximate = self.timed(lambda: approximate_count(posts), options['repeat'])
+        self.stdout.write(f"total: exact COUNT {exact:.2f} ms, approximate {approximate:.2f} ms "
+                          f"{approximate_count(posts)}")
+
+        def render(queryset, serializer):
+            return JSONRenderer().render(serializer(list(queryset[:page_size]), many=True).data)
+
+        for label, queryset, serializer in (('full posts', posts, PostSerializer),
+                                            ('list cards', posts.only(*POST_LIST_FIELDS), PostListSerializer)):
+            elapsed = self.timed(lambda: render(queryset, serializer), options['repeat'] * 4)
+            self.stdout.write(f"{label:<11} page: {len(render(queryset, serializer)):>6} bytes {elapsed:>6.2f} ms")
+
+        for label, query in SEARCHES:
+            request = Request(factory.get('/api/posts/search/', {'q': query}))
+            results = search_posts(user, query).only(*POST_LIST_FIELDS)
+            elapsed = self.timed(lambda: list(PostSearchPaginator().paginate_queryset(results, request)),
+                                 options['repeat'])
+            self.stdout.write(f"search {label:<7} {query!r:<17} {results.count():>5} ranked "
+                              f"first page {elapsed:>7.2f} ms")
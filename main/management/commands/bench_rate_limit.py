@@ -0,0 +1,88 @@
+import time
+import tracemalloc
+from django.core.management.base import BaseCommand
+from main.anti_ddos import SlidingWindowLimiter
+
+
+class LegacyLimiter:
+    """The previous list-of-timestamps AntiDDoSMiddleware logic, kept as the baseline."""
+
+    def __init__(self, limit, window):
+        self.limit = limit
+        self.window = window
+        self.request_count = {}
+
+    def hit(self, ip, now=None):
+        current_time = int(time.time() if now is None else now)
+        if ip not in self.request_count:
+            self.request_count[ip] = []
+        self.request_count[ip] = [t for t in self.request_count[ip] if t > current_time - self.window]
+        if len(self.request_count[ip]) >= self.limit:
+            return False
+        self.request_count[ip].append(current_time)
+        return True
+
+
+def ip(n):
+    return f"{n >> 24 & 255}.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Per-request overhead and memory of the AntiDDoSMiddleware limiter "
+        "against the legacy list-of-timestamps version: a few busy IPs, then "
+        "--ips distinct IPs (1M by default)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ips', type=int, default=1000000, help='Distinct IPs for the memory run')
+        parser.add_argument('--hot', type=int, default=1000, help='IPs in the busy-client run')
+        parser.add_argument('--requests', type=int, default=500000, help='Requests in the busy-client run')
+        parser.add_argument('--rate', type=int, default=100)
+        parser.add_argument('--window', type=int, default=60)
+        parser.add_argument('--max-keys', type=int, default=200000, help='Key cap of the capped run')
+
+    def busy(self, limiter, ips, total):
+        # Requests spread over one window, so the busy IPs sit near the limit
+        step = limiter.window / total
+        now = 1_000_000.0
+        started = time.perf_counter()
+        for i in range(total):
+            limiter.hit(ips[i % len(ips)], now + i * step)
+        return (time.perf_counter() - started) / total * 1e9
+
+    def distinct(self, factory, count):
+        """Time per request of new IPs, then memory held after `count` of them."""
+        limiter, ips = factory(), [ip(0x0A000000 + n) for n in range(count)]
+        started = time.perf_counter()
+        for address in ips:
+            limiter.hit(address, 1_000_000.0)
+        per_request = (time.perf_counter() - started) / count * 1e9
+        del limiter, ips
+
+        tracemalloc.start()
+        limiter = factory()
+        for n in range(count):
+            limiter.hit(ip(0x0A000000 + n), 1_000_000.0)  # Strings made here, like request.META's
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return limiter, per_request, memory
+
+    def handle(self, *args, **options):
+        rate, window = options['rate'], options['window']
+        hot = [ip(0xC0A80000 + n) for n in range(options['hot'])]
+        limiters = {
+            'legacy': lambda: LegacyLimiter(rate, window),
+            'sliding': lambda: SlidingWindowLimiter(rate, window, options['ips']),
+            f"sliding/{options['max_keys']}": lambda: SlidingWindowLimiter(rate, window, options['max_keys']),
+        }
+
+        self.stdout.write(f"{'limiter':<16} {'busy ns/req':>12} {'new-ip ns/req':>14} "
+                          f"{'memory':>10} {'bytes/ip':>9} {'keys':>9}")
+        for label, factory in limiters.items():
+            busy = self.busy(factory(), hot, options['requests'])
+            limiter, per_request, memory = self.distinct(factory, options['ips'])
+            keys = len(limiter.request_count if isinstance(limiter, LegacyLimiter) else limiter)
+            self.stdout.write(f"{label:<16} {busy:>12.0f} {per_request:>14.0f} "
+                              f"{memory / 2 ** 20:>8.1f}MB {memory / options['ips']:>9.0f} {keys:>9}")
+            del limiter
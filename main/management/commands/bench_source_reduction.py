@@ -0,0 +1,44 @@
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand
+from main import generation
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare prompt tokens and end-to-end latency of url/youtube post "
+        "generation with and without map-reduce source reduction, for each "
+        "given text file (e.g. saved transcripts). Uses the configured "
+        "LLM_BACKEND; with LLM_BACKEND=fake set LLM_FAKE_PREFILL_TOKENS_PER_SECOND "
+        "so prompt size affects latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help='Plain text source files')
+        parser.add_argument('--budget', type=int, default=generation.SOURCE_TOKEN_BUDGET,
+                            help='Token budget for the reduced source')
+
+    def _timed_post(self, text):
+        prompt = generation.url_post_prompt(text, 'professional')
+        started = time.perf_counter()
+        generation.generate_json(prompt)
+        return generation.estimate_tokens(prompt), time.perf_counter() - started
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'file':<30} {'src tok':>8} {'before tok':>10} {'before s':>9} {'after tok':>10} {'after s':>8}")
+        for name in options['files']:
+            text = Path(name).read_text(encoding='utf-8', errors='replace')
+
+            before_tokens, before_seconds = self._timed_post(text)
+
+            started = time.perf_counter()
+            reduced = generation.reduce_source(text, options['budget'])
+            reduce_seconds = time.perf_counter() - started
+            after_tokens, after_seconds = self._timed_post(reduced)
+
+            self.stdout.write(
+                f"{Path(name).name[:30]:<30} {generation.estimate_tokens(text):>8} "
+                f"{before_tokens:>10} {before_seconds:>9.2f} "
+                f"{after_tokens:>10} {reduce_seconds + after_seconds:>8.2f}"
+            )
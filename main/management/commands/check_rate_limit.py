@@ -0,0 +1,73 @@
+import multiprocessing
+import os
+import tempfile
+import time
+from django.core.management.base import BaseCommand, CommandError
+from main import anti_ddos
+
+BACKENDS = ('local', 'mmap', 'cache')
+
+
+def make_limiter(backend, limit, window, path):
+    if backend == 'mmap':
+        return anti_ddos.SharedMemoryLimiter(limit, window, path, 1024)
+    if backend == 'cache':
+        return anti_ddos.CacheLimiter(limit, window, anti_ddos.ANTI_DDOS_CACHE)
+    return anti_ddos.SlidingWindowLimiter(limit, window, 1000)
+
+
+def hammer(backend, limit, window, path, ip, now, requests, barrier, results):
+    limiter = make_limiter(backend, limit, window, path)
+    barrier.wait()
+    started = time.perf_counter()
+    allowed = sum(limiter.hit(ip, now) for _ in range(requests))
+    results.put((allowed, time.perf_counter() - started))
+
+
+class Command(BaseCommand):
+    help = (
+        "Start several processes that all hit one IP at once through each "
+        "AntiDDoSMiddleware backend, and check that exactly the limit of "
+        "requests got through in total. The cache backend uses "
+        "ANTI_DDOS_CACHE and is only exact with a shared cache (memcached, Redis)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('backends', nargs='*', default=['local', 'mmap'], choices=BACKENDS)
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per process')
+        parser.add_argument('--limit', type=int, default=anti_ddos.ANTI_DDOS_RATE)
+        parser.add_argument('--window', type=int, default=anti_ddos.ANTI_DDOS_WINDOW)
+
+    def run(self, backend, options):
+        context = multiprocessing.get_context('fork')
+        processes = options['processes']
+        barrier, results = context.Barrier(processes), context.Queue()
+        # Middle of a window, so the previous one (empty) doesn't count
+        now = (int(time.time() / options['window']) + 0.5) * options['window']
+        ip = f'198.51.100.{os.getpid() % 256}'
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'anti-ddos')
+            workers = [context.Process(target=hammer, args=(backend, options['limit'], options['window'], path,
+                                                            ip, now, options['requests'], barrier, results))
+                       for _ in range(processes)]
+            for worker in workers:
+                worker.start()
+            outcomes = [results.get() for _ in workers]
+            for worker in workers:
+                worker.join()
+
+        allowed = sum(allowed for allowed, _ in outcomes)
+        elapsed = max(seconds for _, seconds in outcomes)
+        verdict = 'exact' if allowed == options['limit'] else f"{allowed / options['limit']:.1f}x the limit"
+        self.stdout.write(f"{backend:<6} allowed {allowed:>6} of {processes * options['requests']:>7} "
+                          f"(limit {options['limit']}): {verdict:<16} "
+                          f"{elapsed / options['requests'] * 1e6:>6.1f} us/request")
+        return allowed == options['limit']
+
+    def handle(self, *args, **options):
+        # "local" is per process: N processes are expected to allow N times the limit
+        over = [backend for backend in options['backends'] if not self.run(backend, options) and backend != 'local']
+        if over:
+            raise CommandError(f"Over the limit: {', '.join(over)}")
@@ -0,0 +1,94 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from main.llm import FakeClient, LLMUnavailable
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local fake LLM server for offline load tests. "
+        "Point the app at it with LLM_BACKEND=http LLM_HTTP_URL=http://HOST:PORT"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=settings.LLM_FAKE_LATENCY,
+                            help='Seconds before the first token')
+        parser.add_argument('--tokens-per-second', type=float, default=settings.LLM_FAKE_TOKENS_PER_SECOND)
+        parser.add_argument('--failure-rate', type=float, default=settings.LLM_FAKE_FAILURE_RATE)
+        parser.add_argument('--malformed-rate', type=float, default=settings.LLM_FAKE_MALFORMED_RATE)
+        parser.add_argument('--seed', type=int, default=settings.LLM_FAKE_SEED)
+        parser.add_argument('--prefill-tokens-per-second', type=float,
+                            default=settings.LLM_FAKE_PREFILL_TOKENS_PER_SECOND,
+                            help='Prompt processing rate, adds prompt-size dependent latency')
+
+    def handle(self, *args, **options):
+        client = FakeClient(
+            latency=options['latency'],
+            tokens_per_second=options['tokens_per_second'],
+            failure_rate=options['failure_rate'],
+            malformed_rate=options['malformed_rate'],
+            seed=options['seed'],
+            prefill_tokens_per_second=options['prefill_tokens_per_second'],
+        )
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, code, data):
+                body = json.dumps(data).encode()
+                self.send_response(code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                if self.path.rstrip('/') != '/generate':
+                    return self._send_json(404, {'error': 'not found'})
+
+                length = int(self.headers.get('Content-Length', 0))
+                request = json.loads(self.rfile.read(length) or b'{}')
+                prompt = request.get('prompt', '')
+
+                try:
+                    if not request.get('stream'):
+                        return self._send_json(200, {'text': client.generate(prompt)})
+
+                    chunks = client.generate_stream(prompt)
+                    first = next(chunks)  # Raise injected failures before the headers
+                except LLMUnavailable as e:
+                    return self._send_json(503, {'error': str(e)})
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                for chunk in _chain(first, chunks):
+                    data = chunk.encode()
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b'0\r\n\r\n')
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024  # Listen backlog; the default 5 refuses load test bursts
+
+        server = Server((options['host'], options['port']), Handler)
+        self.stdout.write(f"Fake LLM server listening on http://{options['host']}:{options['port']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+def _chain(first, rest):
+    yield first
+    yield from rest
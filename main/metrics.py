@@ -0,0 +1,23 @@
+# metrics.py
+import threading
+from collections import defaultdict
+
+# Per-process counters (cache hits, saved upstream calls, ...). Exposed to
+# staff users through the `metrics/` endpoint.
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+
+def incr(name, amount=1):
+    with _lock:
+        _counters[name] += amount
+
+
+def get(name):
+    return _counters.get(name, 0)
+
+
+def snapshot():
+    with _lock:
+        return dict(sorted(_counters.items()))
+
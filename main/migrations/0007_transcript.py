@@ -0,0 +1,26 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0006_generationjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Transcript",
+            fields=[
+                (
+                    "video_id",
+                    models.CharField(max_length=11, primary_key=True, serialize=False),
+                ),
+                ("language", models.CharField(blank=True, default="", max_length=16)),
+                ("data", models.BinaryField()),
+                ("hits", models.PositiveIntegerField(default=0)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0007_transcript"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="transcript",
+            name="chapters",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="transcript",
+            name="segments",
+            field=models.BinaryField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+import re
+from html import unescape
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+EXCERPT_LENGTH = 200
+
+
+# Frozen copy of main.models.html_excerpt as of this migration
+def html_excerpt(html, length=EXCERPT_LENGTH):
+    """Plain-text start of an HTML post, cut at a word boundary"""
+    text = " ".join(unescape(re.sub(r"<[^>]+>", " ", html or "")).split())
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(" ", 1)[0] + "\u2026"
+
+
+def backfill_excerpts(apps, schema_editor):
+    """Fill Post.excerpt in batches by primary key, one transaction each,
+    so a large table is never locked or held in memory all at once."""
+    Post = apps.get_model("main", "Post")
+    last = None
+    while True:
+        batch = Post.objects.filter(excerpt="").order_by("pk").only("pk", "content")
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        posts = list(batch[:BATCH_SIZE])
+        if not posts:
+            break
+        for post in posts:
+            post.excerpt = html_excerpt(post.content)
+        with transaction.atomic():
+            Post.objects.bulk_update(posts, ["excerpt"])
+        last = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("main", "0010_post_excerpt"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_excerpts, migrations.RunPython.noop),
+    ]
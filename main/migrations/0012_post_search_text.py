@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0011_backfill_post_excerpt"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="search_text",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+    ]
@@ -0,0 +1,95 @@
+import re
+from html import unescape
+
+from django.db import migrations, transaction
+
+BATCH_SIZE = 1000
+
+# Frozen copies of main.models.html_text and the index DDL of main.search as
+# of this migration: later changes to those must not change what it does.
+TABLE = "main_post"
+FTS_TABLE = f"{TABLE}_fts"
+TS_CONFIG = "english"
+
+POSTGRES_INDEX = [
+    f"""ALTER TABLE {TABLE} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{TS_CONFIG}', coalesce(search_text, '')), 'B')
+    ) STORED""",
+    f"CREATE INDEX post_search_vector_idx ON {TABLE} USING GIN (search_vector)",
+]
+POSTGRES_DROP = [f"ALTER TABLE {TABLE} DROP COLUMN IF EXISTS search_vector"]
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, search_text, content='{TABLE}', content_rowid='rowid', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, search_text) VALUES (new.rowid, new.title, new.search_text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_text)
+        VALUES ('delete', old.rowid, old.title, old.search_text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, search_text ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_text)
+        VALUES ('delete', old.rowid, old.title, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, title, search_text) VALUES (new.rowid, new.title, new.search_text);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",  # Index the existing rows
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def html_text(html):
+    """Plain text of HTML content: tags stripped, entities decoded, whitespace collapsed"""
+    return " ".join(unescape(re.sub(r"<[^>]+>", " ", html or "")).split())
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in {"postgresql": POSTGRES_INDEX, "sqlite": SQLITE_INDEX}.get(vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for statement in {"postgresql": POSTGRES_DROP, "sqlite": SQLITE_DROP}.get(vendor, []):
+        schema_editor.execute(statement)
+
+
+def backfill_search_text(apps, schema_editor):
+    """Fill Post.search_text in batches by primary key, one transaction each."""
+    Post = apps.get_model("main", "Post")
+    last = None
+    while True:
+        batch = Post.objects.filter(search_text="").order_by("pk").only("pk", "content")
+        if last is not None:
+            batch = batch.filter(pk__gt=last)
+        posts = list(batch[:BATCH_SIZE])
+        if not posts:
+            break
+        for post in posts:
+            post.search_text = html_text(post.content)
+        with transaction.atomic():
+            Post.objects.bulk_update(posts, ["search_text"])
+        last = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ("main", "0012_post_search_text"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_search_text, migrations.RunPython.noop),
+        # Built after the backfill, so the existing rows are indexed once
+        migrations.RunPython(create_index, drop_index),
+    ]
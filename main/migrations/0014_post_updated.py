@@ -0,0 +1,59 @@
+# Generated by Django 5.1.2 on 2026-10-18 02:05
+
+import django.utils.timezone
+from django.db import migrations, models
+
+# Frozen copy of the SQLite index of migration 0013, which the table copy
+# SQLite makes for AddField drops (triggers) or leaves stale (rowids)
+TABLE = "main_post"
+FTS_TABLE = f"{TABLE}_fts"
+
+SQLITE_INDEX = [
+    f"""CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        title, search_text, content='{TABLE}', content_rowid='rowid', tokenize='porter unicode61'
+    )""",
+    f"""CREATE TRIGGER {FTS_TABLE}_insert AFTER INSERT ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, search_text) VALUES (new.rowid, new.title, new.search_text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_delete AFTER DELETE ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_text)
+        VALUES ('delete', old.rowid, old.title, old.search_text);
+    END""",
+    f"""CREATE TRIGGER {FTS_TABLE}_update AFTER UPDATE OF title, search_text ON {TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, search_text)
+        VALUES ('delete', old.rowid, old.title, old.search_text);
+        INSERT INTO {FTS_TABLE}(rowid, title, search_text) VALUES (new.rowid, new.title, new.search_text);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",  # Index the existing rows
+]
+SQLITE_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def restore_sqlite_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in SQLITE_DROP + SQLITE_INDEX:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0013_post_search_index"),
+    ]
+
+    operations = [
+        # Restores the index after the field is removed again (reverse order)
+        migrations.RunPython(migrations.RunPython.noop, restore_sqlite_index),
+        migrations.AddField(
+            model_name="post",
+            name="updated",
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(restore_sqlite_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations
+
+FTS_TABLE = "main_post_fts"
+
+
+def rank_titles_higher(apps, schema_editor):
+    """The FTS5 rank column: bm25 with titles weighing twice the text"""
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25(2.0, 1.0)')")
+
+
+def rank_default(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('rank', 'bm25()')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("main", "0014_post_updated"),
+    ]
+
+    operations = [
+        # Kept in the FTS table's config: a migration that rebuilds the
+        # index (see 0014) has to set it again
+        migrations.RunPython(rank_titles_higher, rank_default),
+    ]
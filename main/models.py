@@ -1,9 +1,26 @@
 from django.db import models
+import json
+import re
 import uuid
+import zlib
+from html import unescape
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+EXCERPT_LENGTH = 200
+
+def html_text(html):
+    """Plain text of HTML content: tags stripped, entities decoded, whitespace collapsed"""
+    return ' '.join(unescape(re.sub(r'<[^>]+>', ' ', html or '')).split())
+
+def html_excerpt(html, length=EXCERPT_LENGTH):
+    """Plain-text start of an HTML post, cut at a word boundary"""
+    text = html_text(html)
+    if len(text) <= length:
+        return text
+    return text[:length].rsplit(' ', 1)[0] + '\u2026'
+
 class Post(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -11,8 +28,78 @@ class Post(models.Model):
     content = models.TextField()  # HTML content
     created = models.DateTimeField(auto_now_add=True)
     length = models.PositiveIntegerField()
+    # Plain text for the post list, derived from content on save
+    excerpt = models.CharField(max_length=EXCERPT_LENGTH + 1, blank=True, default='')
+    # Tag-stripped content, indexed for full-text search (see search.py)
+    search_text = models.TextField(blank=True, default='', editable=False)
     edited = models.BooleanField(default=False)
+    # Set by save() and bulk_create (not by QuerySet.update); part of the ETags
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # post_list: a user's posts by date, id breaks ties for cursor pagination
+            models.Index(fields=['user', 'created', 'id'], name='post_user_created_id_idx'),
+        ]
+
+    def derive_text(self):
+        """Fill excerpt and search_text from content (save() does; bulk_create doesn't)"""
+        self.excerpt = html_excerpt(self.content)
+        self.search_text = html_text(self.content)
 
     def save(self, *args, **kwargs):
         self.length = len(self.content)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.derive_text()
+        super().save(*args, **kwargs)
+
+class GenerationJob(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    kind = models.CharField(max_length=20)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, default='')
+    post = models.ForeignKey(Post, null=True, blank=True, on_delete=models.SET_NULL)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+class Transcript(models.Model):
+    """YouTube transcript, stored once per video (see transcripts.py)"""
+    video_id = models.CharField(max_length=11, primary_key=True)
+    language = models.CharField(max_length=16, blank=True, default='')
+    data = models.BinaryField()  # zlib-compressed UTF-8 text
+    # zlib-compressed JSON [[start, duration, text], ...] in seconds
+    segments = models.BinaryField(null=True, blank=True)
+    # [{title, start, end}, ...]; null until looked up
+    chapters = models.JSONField(null=True, blank=True)
+    hits = models.PositiveIntegerField(default=0)  # Lookups served without an API call
+    created = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def compress(text):
+        return zlib.compress(text.encode('utf-8'))
+
+    @property
+    def text(self):
+        return zlib.decompress(bytes(self.data)).decode('utf-8')
+
+    @property
+    def segment_list(self):
+        if not self.segments:
+            return []
+        return json.loads(zlib.decompress(bytes(self.segments)))
+
+    def set_segments(self, segments):
+        self.segments = self.compress(json.dumps(segments)) if segments else None
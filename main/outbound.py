@@ -0,0 +1,298 @@
+# outbound.py
+"""
+Shared client for outbound HTTP calls (scraped pages, transcript APIs).
+
+Each worker process keeps one pooled keep-alive httpx.Client, plus one
+httpx.AsyncClient per event loop, so repeated calls to the same host skip
+DNS and the TCP/TLS handshake. On top of the pool:
+
+- connect / read timeouts on every call,
+- at most OUTBOUND_HOST_CONCURRENCY calls in flight per host,
+- idempotent requests are retried on connection errors and 429/502/503/504
+  with jittered exponential backoff,
+- with use_proxy=True, each attempt goes through a proxy from proxy_pool
+  (a different one on retry) and its outcome feeds the pool's health
+  scores; without an available proxy the call goes out directly.
+
+Counters: `outbound.requests`, `outbound.connections` (new connections
+opened), `outbound.handshake_ms` (time spent opening them),
+`outbound.retries` and `outbound.host_waits` (calls queued by the host cap).
+Connection reuse rate is 1 - connections / requests; the handshake time saved
+is roughly (requests - connections) * handshake_ms / connections.
+"""
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from urllib.parse import urlsplit
+import httpx
+from django.conf import settings
+from . import metrics, proxy_pool
+
+POOL_MAX_CONNECTIONS = getattr(settings, 'OUTBOUND_POOL_MAX_CONNECTIONS', 100)
+POOL_MAX_KEEPALIVE = getattr(settings, 'OUTBOUND_POOL_MAX_KEEPALIVE', 20)
+KEEPALIVE_EXPIRY = getattr(settings, 'OUTBOUND_KEEPALIVE_EXPIRY', 30)  # seconds
+CONNECT_TIMEOUT = getattr(settings, 'OUTBOUND_CONNECT_TIMEOUT', 5)
+READ_TIMEOUT = getattr(settings, 'OUTBOUND_READ_TIMEOUT', 15)
+HOST_CONCURRENCY = getattr(settings, 'OUTBOUND_HOST_CONCURRENCY', 8)
+MAX_RETRIES = getattr(settings, 'OUTBOUND_MAX_RETRIES', 2)
+RETRY_BASE_DELAY = getattr(settings, 'OUTBOUND_RETRY_DELAY', 0.5)  # seconds
+PROXY_CLIENTS = getattr(settings, 'OUTBOUND_PROXY_CLIENTS', 32)  # kept alive per process / loop
+
+RETRY_STATUSES = {429, 502, 503, 504}
+# Through a proxy these mostly mean the proxy is blocked, dead or overloaded
+PROXY_FAILURE_STATUSES = {403, 407, 429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def timeout(read=None, connect=None):
+    return httpx.Timeout(read or READ_TIMEOUT, connect=connect or CONNECT_TIMEOUT)
+
+
+def _client_options():
+    return {
+        'timeout': timeout(),
+        'follow_redirects': True,
+        'limits': httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+    }
+
+
+class _Handshake:
+    """httpcore trace hook timing the connections a request had to open."""
+
+    def __init__(self):
+        self.started = None
+
+    def event(self, name):
+        if name == 'connection.connect_tcp.started':
+            self.started = time.monotonic()
+            metrics.incr('outbound.connections')
+        elif self.started is not None and name in ('connection.connect_tcp.complete',
+                                                   'connection.start_tls.complete'):
+            # For TLS the TCP part was counted already; add the remainder
+            now = time.monotonic()
+            metrics.incr('outbound.handshake_ms', int((now - self.started) * 1000))
+            self.started = now
+
+    def trace(self, name, info):
+        self.event(name)
+
+    async def atrace(self, name, info):
+        self.event(name)
+
+
+def _should_retry(method, attempt, response=None, proxy=None):
+    if method not in IDEMPOTENT_METHODS or attempt >= MAX_RETRIES:
+        return False
+    if response is None:
+        return True
+    return response.status_code in (PROXY_FAILURE_STATUSES if proxy else RETRY_STATUSES)
+
+
+def _backoff(attempt):
+    return RETRY_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def _host(url):
+    return urlsplit(str(url)).netloc.lower()
+
+
+def _proxy_client(clients, proxy, factory):
+    """Client for `proxy` from the LRU dict `clients`. Evicted clients are
+    left to the garbage collector: another call may still be reading from one."""
+    client = clients.pop(proxy.url, None)
+    if client is None:
+        client = factory(proxy=proxy.url, **_client_options())
+    clients[proxy.url] = client
+    while len(clients) > PROXY_CLIENTS:
+        clients.pop(next(iter(clients)))
+    return client
+
+
+def _report(proxy, started, response=None):
+    if proxy is not None:
+        ok = response is not None and response.status_code not in PROXY_FAILURE_STATUSES
+        proxy_pool.report(proxy, ok, time.monotonic() - started)
+
+
+# Sync client, one per worker process
+
+_client = None
+_client_pid = None
+_host_slots = {}
+_proxy_clients = {}
+_lock = threading.Lock()
+
+
+def get_client():
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _lock:
+            if _client is None or _client_pid != os.getpid():
+                # A client inherited through fork() shares sockets with the parent
+                _client = httpx.Client(**_client_options())
+                _client_pid = os.getpid()
+                _host_slots.clear()
+                _proxy_clients.clear()
+    return _client
+
+
+def _sync_proxy_client(proxy):
+    with _lock:
+        return _proxy_client(_proxy_clients, proxy, httpx.Client)
+
+
+def _host_slot(host):
+    with _lock:
+        slot = _host_slots.get(host)
+        if slot is None:
+            slot = _host_slots[host] = threading.BoundedSemaphore(HOST_CONCURRENCY)
+    return slot
+
+
+@contextmanager
+def _held(slot):
+    if not slot.acquire(blocking=False):
+        metrics.incr('outbound.host_waits')
+        slot.acquire()
+    try:
+        yield
+    finally:
+        slot.release()
+
+
+def _send(client, method, url, stream, use_proxy=False, **kwargs):
+    for attempt in range(MAX_RETRIES + 1):
+        proxy = proxy_pool.choose() if use_proxy else None
+        sender = _sync_proxy_client(proxy) if proxy else client
+        handshake = _Handshake()
+        request = sender.build_request(method, url, extensions={'trace': handshake.trace}, **kwargs)
+        metrics.incr('outbound.requests')
+        started = time.monotonic()
+        try:
+            response = sender.send(request, stream=stream)
+        except httpx.TransportError:
+            _report(proxy, started)
+            if not _should_retry(method, attempt, proxy=proxy):
+                raise
+        else:
+            _report(proxy, started, response)
+            if not _should_retry(method, attempt, response, proxy):
+                return response
+            response.close()
+
+        metrics.incr('outbound.retries')
+        if proxy is None:  # Another proxy is another route: no need to wait
+            time.sleep(_backoff(attempt))
+
+
+@contextmanager
+def stream(method, url, **kwargs):
+    """
+    Send a request and yield the response with its body still unread.
+    The host slot is held until the block exits.
+
+    kwargs are httpx.Client.build_request() arguments (params, headers, timeout...)
+    and use_proxy. Only proxy requests that carry no credentials.
+    """
+    client = get_client()
+    with _held(_host_slot(_host(url))):
+        response = _send(client, method, url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
+
+
+def request(method, url, **kwargs):
+    """Send a request and return the response with its body read."""
+    client = get_client()
+    with _held(_host_slot(_host(url))):
+        return _send(client, method, url, stream=False, **kwargs)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+# Async client, one per event loop (an AsyncClient can't move between loops)
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _loop_state():
+    loop = asyncio.get_running_loop()
+    state = _async_clients.get(loop)
+    if state is None:
+        state = _async_clients[loop] = (httpx.AsyncClient(**_client_options()), {}, {})
+    return state
+
+
+def _async_host_slot(slots, host):
+    slot = slots.get(host)
+    if slot is None:
+        slot = slots[host] = asyncio.Semaphore(HOST_CONCURRENCY)
+    return slot
+
+
+@asynccontextmanager
+async def _aheld(slot):
+    if slot.locked():
+        metrics.incr('outbound.host_waits')
+    async with slot:
+        yield
+
+
+async def _asend(client, method, url, stream, use_proxy=False, proxy_clients=None, **kwargs):
+    for attempt in range(MAX_RETRIES + 1):
+        proxy = proxy_pool.choose() if use_proxy else None
+        sender = _proxy_client(proxy_clients, proxy, httpx.AsyncClient) if proxy else client
+        handshake = _Handshake()
+        request = sender.build_request(method, url, extensions={'trace': handshake.atrace}, **kwargs)
+        metrics.incr('outbound.requests')
+        started = time.monotonic()
+        try:
+            response = await sender.send(request, stream=stream)
+        except httpx.TransportError:
+            _report(proxy, started)
+            if not _should_retry(method, attempt, proxy=proxy):
+                raise
+        else:
+            _report(proxy, started, response)
+            if not _should_retry(method, attempt, response, proxy):
+                return response
+            await response.aclose()
+
+        metrics.incr('outbound.retries')
+        if proxy is None:
+            await asyncio.sleep(_backoff(attempt))
+
+
+@asynccontextmanager
+async def astream(method, url, **kwargs):
+    """Async counterpart of stream()."""
+    client, slots, proxy_clients = _loop_state()
+    async with _aheld(_async_host_slot(slots, _host(url))):
+        response = await _asend(client, method, url, stream=True, proxy_clients=proxy_clients, **kwargs)
+        try:
+            yield response
+        finally:
+            await response.aclose()
+
+
+async def arequest(method, url, **kwargs):
+    """Async counterpart of request()."""
+    client, slots, proxy_clients = _loop_state()
+    async with _aheld(_async_host_slot(slots, _host(url))):
+        return await _asend(client, method, url, stream=False, proxy_clients=proxy_clients, **kwargs)
+
+
+async def aget(url, **kwargs):
+    return await arequest('GET', url, **kwargs)
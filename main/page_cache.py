@@ -0,0 +1,203 @@
+# page_cache.py
+"""
+Disk-backed cache of extracted page text, shared by the worker processes
+of one host.
+
+Entries are keyed by a hash of the normalized URL and keep the page's
+ETag / Last-Modified. While an entry is fresh (its own TTL, taken from
+Cache-Control max-age when the page sends one) it is served without any
+network call. After that it is revalidated with a conditional GET, and a
+304 serves the stored text again without downloading or parsing the page.
+
+The store is bounded by PAGE_CACHE_MAX_BYTES; the least recently used
+entries (file mtime is bumped on every hit) are evicted first.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PAGE_CACHE_DIR = getattr(settings, 'PAGE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'metag-page-cache'))
+PAGE_CACHE_MAX_BYTES = getattr(settings, 'PAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024)  # 0 disables
+PAGE_CACHE_TTL = getattr(settings, 'PAGE_CACHE_TTL', 60 * 60)  # without Cache-Control
+PAGE_CACHE_MAX_TTL = getattr(settings, 'PAGE_CACHE_MAX_TTL', 24 * 60 * 60)
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref_src)$', re.IGNORECASE)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def normalize_url(url):
+    """Canonical form of `url`: lowercase scheme/host, no default port,
+    fragment or tracking parameters, sorted query."""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not TRACKING_PARAMS.match(k))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def _ttl(headers):
+    """Per-entry TTL from Cache-Control; None when the page must not be stored."""
+    cache_control = headers.get('Cache-Control', '').lower()
+    if 'no-store' in cache_control or 'private' in cache_control:
+        return None
+    if 'no-cache' in cache_control:
+        return 0
+    max_age = re.search(r'max-age=(\d+)', cache_control)
+    if max_age:
+        return min(int(max_age.group(1)), PAGE_CACHE_MAX_TTL)
+    expires = headers.get('Expires')
+    if expires:
+        try:
+            return max(0, min(int(parsedate_to_datetime(expires).timestamp() - time.time()), PAGE_CACHE_MAX_TTL))
+        except (TypeError, ValueError):
+            return 0
+    return PAGE_CACHE_TTL
+
+
+class PageCache:
+    """Entries are zlib-compressed JSON files. Counter: `page_cache.evicted`."""
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._size = None  # Bytes on disk, counted on first write
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _path(self, url):
+        key = hashlib.sha256(normalize_url(url).encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], key + '.page')
+
+    def get(self, url):
+        """The stored entry for `url` (fresh or not), or None."""
+        if not self.enabled:
+            return None
+        path = self._path(url)
+        try:
+            with open(path, 'rb') as f:
+                entry = json.loads(zlib.decompress(f.read()))
+            os.utime(path)  # LRU: mtime is the last access
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as e:
+            logger.warning(f"Dropping unreadable page cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        return entry
+
+    @staticmethod
+    def is_fresh(entry):
+        return time.time() < entry['stored'] + entry['ttl']
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def put(self, url, text, headers):
+        """Store the extracted `text` of a 200 response with `headers`."""
+        ttl = _ttl(headers)
+        if not self.enabled or not text or ttl is None:
+            return
+        self._write(url, {
+            'url': normalize_url(url),
+            'text': text,
+            'etag': headers.get('ETag'),
+            'last_modified': headers.get('Last-Modified'),
+            'stored': time.time(),
+            'ttl': ttl,
+        })
+
+    def refresh(self, url, entry, headers):
+        """Restart the TTL of `entry` after a 304; the text is still valid."""
+        ttl = _ttl(headers)
+        entry.update(stored=time.time(), ttl=PAGE_CACHE_TTL if ttl is None else ttl)
+        entry['etag'] = headers.get('ETag') or entry.get('etag')
+        entry['last_modified'] = headers.get('Last-Modified') or entry.get('last_modified')
+        self._write(url, entry)
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        data = zlib.compress(json.dumps(entry).encode())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                previous = os.path.getsize(path)
+            except OSError:
+                previous = 0
+            # Write then rename, so other workers never read a partial file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.warning(f"Could not write page cache entry {path}: {e}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.page'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _disk_usage(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self):
+        """Drop least recently used entries until the store is at 90% of its bound."""
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            if self._remove(path):
+                self._size -= size
+                metrics.incr('page_cache.evicted')
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+page_cache = PageCache(PAGE_CACHE_DIR, PAGE_CACHE_MAX_BYTES)
@@ -0,0 +1,99 @@
+# post_cache.py
+"""
+Read-through cache of serialized posts for post detail (`posts/<pk>/`).
+
+The editor fetches the same post over and over, so the PostSerializer
+payload is cached per (user, post id, version). A hit costs one primary
+key lookup of the post's `updated` stamp instead of loading the row and
+serializing it; an entry older than the row is a miss. time_ago is left out of the cached payload and computed for
+each response, so an entry never goes stale by just sitting there.
+
+Each post has a version number in the cache. Saving or deleting a post
+(post_save / post_delete, so every write path: edit, editor save,
+regenerate, delete, cascades) drops it; the next read starts a new version
+and the old entries are never looked at again. A read that raced with a
+write stores the old row under the old version, where nobody finds it.
+QuerySet.update() and bulk_create() send no signals: call invalidate()
+after using them on existing posts.
+
+The versions only free memory early. The `updated` check is what keeps
+entries correct: with a local memory cache (POST_CACHE not shared) the
+other workers never see a write's invalidation, but they do see the new
+stamp.
+
+Counters: `post_cache.hit`, `post_cache.miss` (and `post_cache.outdated`
+among them, an entry older than the row), `post_cache.invalidated`.
+"""
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from . import metrics
+from .models import Post
+from .serializers import PostSerializer, time_ago
+
+POST_CACHE = getattr(settings, 'POST_CACHE', 'default')
+POST_CACHE_TTL = getattr(settings, 'POST_CACHE_TTL', 5 * 60)  # seconds
+
+
+def _version_key(pk):
+    return f'post:{pk}:version'
+
+
+def _version(cache, pk):
+    """Current version of post `pk`, starting a new one when there is none."""
+    key = _version_key(pk)
+    version = cache.get(key)
+    if version is None:
+        # Unique even if the key was evicted while older entries were kept
+        cache.add(key, time.time_ns(), POST_CACHE_TTL)
+        version = cache.get(key)
+    return version
+
+
+def _payload(entry):
+    """Response data of a cached (fields, created, updated) entry, time_ago as of now"""
+    fields, created, _ = entry
+    return {name: time_ago(created) if name == 'time_ago' else fields[name]
+            for name in PostSerializer.Meta.fields}
+
+
+def get_post(user, pk):
+    """(serialized post `pk` of `user`, its `updated`); raises Post.DoesNotExist."""
+    cache = caches[POST_CACHE]
+    key = f'post_detail:{pk}:{user.pk}:{_version(cache, pk)}'
+    entry = cache.get(key)
+    if entry is not None:
+        updated = Post.objects.filter(pk=pk, user=user).values_list('updated', flat=True).first()
+        if updated is None:
+            raise Post.DoesNotExist
+        if updated == entry[2]:
+            metrics.incr('post_cache.hit')
+            return _payload(entry), updated
+        metrics.incr('post_cache.outdated')
+
+    metrics.incr('post_cache.miss')
+    post = Post.objects.get(pk=pk, user=user)
+    fields = dict(PostSerializer(post).data)
+    del fields['time_ago']
+    entry = (fields, post.created, post.updated)
+    cache.set(key, entry, POST_CACHE_TTL)
+    return _payload(entry), post.updated
+
+
+def invalidate(pk):
+    caches[POST_CACHE].delete(_version_key(pk))
+    metrics.incr('post_cache.invalidated')
+
+
+@receiver(post_save, sender=Post, dispatch_uid='post_cache_save')
+@receiver(post_delete, sender=Post, dispatch_uid='post_cache_delete')
+def _invalidate_post(sender, instance, **kwargs):
+    invalidate(instance.pk)
+
+
+def stats():
+    """Hit rate of this process"""
+    hits, misses = metrics.get('post_cache.hit'), metrics.get('post_cache.miss')
+    return {'post_cache.hit_rate': round(hits / (hits + misses), 3) if hits + misses else None}
@@ -0,0 +1,233 @@
+# proxy_pool.py
+"""
+Rotating pool of outbound proxies, loaded from settings.PROXY_LIST.
+
+The file (thousands of entries) is parsed once per process into parallel
+typed arrays: a packed IPv4 address, port and protocol code per proxy plus
+its health state, instead of a dict per proxy.
+
+Proxies are picked at random weighted by health: an EWMA of successes,
+divided down by an EWMA of latency. The weights live in a Fenwick tree, so
+picking and re-weighting are O(log n). A failing proxy is quarantined
+(weight 0) for PROXY_QUARANTINE_BASE * 2^(consecutive failures - 1)
+seconds, up to PROXY_QUARANTINE_MAX, then gets another chance.
+
+Only use the pool for requests that carry no secrets: these are free
+public proxies.
+
+Counters: `proxy.ok`, `proxy.failed`, `proxy.quarantined`, `proxy.none`
+(no proxy available, request went out directly).
+"""
+import array
+import heapq
+import ipaddress
+import json
+import logging
+import random
+import threading
+import time
+from collections import namedtuple
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+QUARANTINE_BASE = getattr(settings, 'PROXY_QUARANTINE_BASE', 30)  # seconds
+QUARANTINE_MAX = getattr(settings, 'PROXY_QUARANTINE_MAX', 60 * 60)
+LATENCY_TARGET = getattr(settings, 'PROXY_LATENCY_TARGET', 2.0)  # seconds; halves the weight
+EWMA_ALPHA = 0.3
+MIN_WEIGHT = 0.01
+REBUILD_EVERY = 10000  # Tree updates between rebuilds (float drift)
+
+PROTOCOLS = ('http', 'socks4', 'socks5')
+# Transparent proxies forward our own IP, which defeats the point
+ANONYMITY_LEVELS = {'elite', 'anonymous'}
+
+Proxy = namedtuple('Proxy', 'index url')
+
+
+class _WeightTree:
+    """Fenwick tree over float weights: O(log n) update, total and weighted pick."""
+
+    def __init__(self, weights):
+        self.size = len(weights)
+        self.tree = array.array('d', [0.0]) * (self.size + 1)
+        for i, weight in enumerate(weights, 1):
+            self.tree[i] += weight
+            parent = i + (i & -i)
+            if parent <= self.size:
+                self.tree[parent] += self.tree[i]
+        self.top = 1 << max(self.size.bit_length() - 1, 0)
+
+    def add(self, index, delta):
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        total, i = 0.0, self.size
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target):
+        """Index whose cumulative weight range contains `target`."""
+        position, step = 0, self.top
+        while step:
+            following = position + step
+            if following <= self.size and self.tree[following] <= target:
+                position = following
+                target -= self.tree[following]
+            step >>= 1
+        return min(position, self.size - 1)
+
+
+class ProxyPool:
+    def __init__(self, entries):
+        """entries: iterable of (ip (str or int), port, protocol, score) tuples."""
+        self._ip = array.array('I')
+        self._port = array.array('H')
+        self._protocol = array.array('B')
+        self._success = array.array('f')  # EWMA of outcomes, 0..1
+        self._latency = array.array('f')  # EWMA of seconds to response
+        self._failures = array.array('B')  # Consecutive failures
+        self._until = array.array('d')  # Quarantined until (monotonic)
+        for ip, port, protocol, score in entries:
+            self._ip.append(int(ipaddress.IPv4Address(ip)))
+            self._port.append(port)
+            self._protocol.append(PROTOCOLS.index(protocol))
+            self._success.append(min(max(float(score), 0.0), 1.0) * 0.5)
+            self._latency.append(0.0)
+            self._failures.append(0)
+            self._until.append(0.0)
+
+        self._weight = array.array('d', (self._health(i) for i in range(len(self))))
+        self._tree = _WeightTree(self._weight)
+        self._quarantine = []  # heap of (until, index)
+        self._updates = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path, protocols=('http',)):
+        with open(path) as f:
+            data = json.load(f)
+
+        def entries():
+            for item in data:
+                if item.get('protocol') not in protocols or item.get('anonymity') not in ANONYMITY_LEVELS:
+                    continue
+                try:
+                    ip = int(ipaddress.IPv4Address(item['ip']))
+                except (KeyError, ValueError):
+                    continue
+                yield ip, int(item['port']), item['protocol'], item.get('score', 1)
+
+        return cls(entries())
+
+    def __len__(self):
+        return len(self._ip)
+
+    def url(self, index):
+        return f"{PROTOCOLS[self._protocol[index]]}://{ipaddress.IPv4Address(self._ip[index])}:{self._port[index]}"
+
+    def _health(self, index):
+        success = max(self._success[index], MIN_WEIGHT)
+        return success / (1 + self._latency[index] / LATENCY_TARGET)
+
+    def _set_weight(self, index, weight):
+        self._tree.add(index, weight - self._weight[index])
+        self._weight[index] = weight
+        self._updates += 1
+        if self._updates >= REBUILD_EVERY:
+            self._tree = _WeightTree(self._weight)
+            self._updates = 0
+
+    def _release(self, now):
+        while self._quarantine and self._quarantine[0][0] <= now:
+            _, index = heapq.heappop(self._quarantine)
+            if 0 < self._until[index] <= now:
+                self._until[index] = 0.0
+                self._set_weight(index, self._health(index))
+
+    def choose(self):
+        """A Proxy picked by health, or None when every proxy is quarantined."""
+        with self._lock:
+            self._release(time.monotonic())
+            total = self._tree.total()
+            if not len(self) or total <= 0:
+                metrics.incr('proxy.none')
+                return None
+            index = self._tree.find(random.random() * total)
+        return Proxy(index, self.url(index))
+
+    def report(self, proxy, ok, latency=None):
+        """Feed back the outcome of a request made through `proxy`."""
+        if proxy is None:
+            return
+        index = proxy.index
+        with self._lock:
+            if ok:
+                self._success[index] = (1 - EWMA_ALPHA) * self._success[index] + EWMA_ALPHA
+                if latency is not None:
+                    self._latency[index] = (1 - EWMA_ALPHA) * self._latency[index] + EWMA_ALPHA * latency
+                self._failures[index] = 0
+                self._until[index] = 0.0
+                self._set_weight(index, self._health(index))
+                metrics.incr('proxy.ok')
+                return
+
+            self._success[index] = (1 - EWMA_ALPHA) * self._success[index]
+            self._failures[index] = min(self._failures[index] + 1, 255)
+            backoff = min(QUARANTINE_BASE * 2 ** (self._failures[index] - 1), QUARANTINE_MAX)
+            self._until[index] = time.monotonic() + backoff
+            heapq.heappush(self._quarantine, (self._until[index], index))
+            self._set_weight(index, 0.0)
+        metrics.incr('proxy.failed')
+        metrics.incr('proxy.quarantined')
+
+    def snapshot(self):
+        with self._lock:
+            self._release(time.monotonic())
+            quarantined = sum(1 for until in self._until if until)
+        return {'proxy.loaded': len(self), 'proxy.quarantined_now': quarantined}
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _protocols():
+    try:
+        import socksio  # noqa: F401  httpx needs it for SOCKS proxies
+    except ImportError:
+        return ('http',)
+    return PROTOCOLS
+
+
+def get_pool():
+    """The process-wide pool, loaded from settings.PROXY_LIST on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                try:
+                    _pool = ProxyPool.from_file(settings.PROXY_LIST, _protocols())
+                except (OSError, ValueError) as e:
+                    logger.error(f"Could not load proxy list {settings.PROXY_LIST}: {e}")
+                    _pool = ProxyPool(())
+    return _pool
+
+
+def choose():
+    return get_pool().choose()
+
+
+def report(proxy, ok, latency=None):
+    if proxy is not None:
+        get_pool().report(proxy, ok, latency)
+
+
+def stats():
+    return get_pool().snapshot() if _pool is not None else {}
@@ -0,0 +1,180 @@
+# quotas.py
+"""
+Per-user, cost-weighted quotas for the API endpoints.
+
+Each endpoint belongs to one or more route classes (QUOTA_CLASSES): "llm"
+(calls the model), "scrape" (downloads a page or transcript), "write"
+(saves a post from the editor: a row write plus its search index update)
+and "read" (database reads only; post detail's rare DELETE counts as one
+too). A class has a weight, the cost of one request, and
+budgets of cost units per minute and per day. A request is charged up
+front, before any upstream work; when a budget would be exceeded it is
+answered 429 with Retry-After (seconds until that budget resets) and
+nothing is charged. A request costing more than a whole budget (a batch
+too big for it) can never succeed and is answered 400 instead.
+
+The llm budgets fit a full batch (BATCH_MAX_ITEMS generations) per minute.
+
+Responses carry X-Quota-Remaining-Minute / X-Quota-Remaining-Day: how many
+more requests like this one fit in the tightest budget.
+
+The counters live in the QUOTA_CACHE Django cache; point it at a shared
+cache (memcached, Redis: settings.REDIS_URL) so all workers draw on the
+same budget. With a local memory cache each worker keeps its own counters,
+so N workers allow N times the budgets; check_cache() warns about that at
+startup outside DEBUG.
+
+Counters: `quota.<class>.rejected`, `quota.<class>.too_large`.
+"""
+import logging
+import math
+import time
+from collections import namedtuple
+from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+QUOTA_CACHE = getattr(settings, 'QUOTA_CACHE', 'default')
+QUOTA_CLASSES = getattr(settings, 'QUOTA_CLASSES', {
+    'llm': {'weight': 10, 'per_minute': 600, 'per_day': 20000},
+    'scrape': {'weight': 5, 'per_minute': 100, 'per_day': 5000},
+    'write': {'weight': 2, 'per_minute': 120, 'per_day': 10000},
+    'read': {'weight': 1, 'per_minute': 300, 'per_day': 50000},
+})
+QUOTA_EXEMPT = set(getattr(settings, 'QUOTA_EXEMPT', ()))  # User emails, e.g. a load test account
+
+PERIODS = (('minute', 60), ('day', 24 * 60 * 60))
+
+# remaining: {period: requests left}; retry_after: seconds (rejected only,
+# None when the request is bigger than the budget itself)
+Usage = namedtuple('Usage', 'allowed remaining retry_after')
+
+
+def _add(cache, key, amount, timeout):
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        cache.add(key, 0, timeout=timeout)
+        return cache.incr(key, amount)
+
+
+def check_cache():
+    """Warn when the counters are per worker process (called by MainConfig.ready)."""
+    if not settings.DEBUG and isinstance(caches[QUOTA_CACHE], LocMemCache):
+        logger.warning(f"QUOTA_CACHE '{QUOTA_CACHE}' is a local memory cache: every worker process "
+                       f"enforces its own quotas. Set REDIS_URL to share them.")
+
+
+def max_units(name):
+    """Most requests of class `name` one call may count as (its smallest budget)"""
+    rule = QUOTA_CLASSES[name]
+    budgets = [rule[f'per_{period}'] for period, _ in PERIODS if rule.get(f'per_{period}')]
+    return min(budgets) // rule['weight'] if budgets else math.inf
+
+
+def charge(user, classes, units=1, now=None):
+    """Charge `units` requests of `classes` to `user`, or nothing if a budget is exceeded."""
+    if user.email in QUOTA_EXEMPT:
+        return Usage(True, {}, None)
+    cache = caches[QUOTA_CACHE]
+    now = time.time() if now is None else now
+    remaining = {}
+    charged = []
+
+    for name in classes:
+        if units > max_units(name):
+            metrics.incr(f'quota.{name}.too_large')
+            return Usage(False, {}, None)
+
+    for name in classes:
+        rule = QUOTA_CLASSES[name]
+        cost = rule['weight'] * units
+        for period, seconds in PERIODS:
+            budget = rule.get(f'per_{period}')
+            if not budget:
+                continue
+            index = int(now // seconds)
+            key = f'quota:{user.pk}:{name}:{period}:{index}'
+            used = _add(cache, key, cost, timeout=seconds + 60)
+            charged.append((key, cost))
+
+            if used > budget:
+                for charged_key, charged_cost in charged:
+                    cache.decr(charged_key, charged_cost)
+                metrics.incr(f'quota.{name}.rejected')
+                return Usage(False, {}, math.ceil((index + 1) * seconds - now))
+
+            left = (budget - used) // rule['weight']
+            remaining[period] = min(remaining.get(period, left), left)
+
+    return Usage(True, remaining, None)
+
+
+def _headers(usage):
+    headers = {f'X-Quota-Remaining-{period.capitalize()}': str(left) for period, left in usage.remaining.items()}
+    if usage.retry_after is not None:
+        headers['Retry-After'] = str(usage.retry_after)
+    return headers
+
+
+def _annotate(response, usage):
+    for name, value in _headers(usage).items():
+        response[name] = value
+    return response
+
+
+def _status(usage):
+    if usage.retry_after is None:
+        return status.HTTP_400_BAD_REQUEST  # Retrying won't help
+    return status.HTTP_429_TOO_MANY_REQUESTS
+
+
+def _rejection(classes, usage):
+    if usage.retry_after is None:
+        return f'Request too large for the quota: at most {min(max_units(name) for name in classes)} items'
+    return 'Quota exceeded'
+
+
+def limit(*classes, units=None):
+    """
+    View decorator charging each request to the user's quotas of `classes`.
+    Goes below @api_view / @permission_classes (or @async_api_view), so the
+    user is authenticated already. `units(request)` gives the number of
+    requests a call counts as (e.g. the items of a batch).
+
+    A request is charged once: views delegating to another decorated view
+    pass the charge along.
+    """
+    def decorator(func):
+        if iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(request, *args, **kwargs):
+                if getattr(request, 'quota_usage', None) is not None:
+                    return await func(request, *args, **kwargs)
+                usage = await sync_to_async(charge)(request.user, classes, units(request) if units else 1)
+                if not usage.allowed:
+                    return _annotate(JsonResponse({'detail': _rejection(classes, usage)},
+                                                  status=_status(usage)), usage)
+                request.quota_usage = usage
+                return _annotate(await func(request, *args, **kwargs), usage)
+        else:
+            @wraps(func)
+            def wrapper(request, *args, **kwargs):
+                if getattr(request, 'quota_usage', None) is not None:
+                    return func(request, *args, **kwargs)
+                usage = charge(request.user, classes, units(request) if units else 1)
+                if not usage.allowed:
+                    return Response({'detail': _rejection(classes, usage)}, status=_status(usage),
+                                    headers=_headers(usage))
+                request.quota_usage = usage
+                return _annotate(func(request, *args, **kwargs), usage)
+        return wrapper
+    return decorator
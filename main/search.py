@@ -0,0 +1,86 @@
+# search.py
+"""
+Full-text search over a user's posts, on Post.title and Post.search_text
+(the tag-stripped content, kept up to date by Post.save()).
+
+The index lives in the database, outside of the model, so Django never
+writes to it and it can't drift from the rows:
+
+- PostgreSQL: a generated tsvector column, title weighted above the text,
+  with a GIN index; ranked with ts_rank.
+- SQLite: an FTS5 table over main_post, kept in sync by triggers on
+  insert / update / delete; ranked by its rank column (bm25, titles
+  weighing twice the text: migration 0015).
+
+Both are created by migration 0013, which holds the DDL. Other databases
+fall back to an unranked icontains scan. SQLite applies most migrations on
+main_post by copying the table, which drops the triggers: such a migration
+rebuilds the index afterwards from its own copy of the DDL, as 0014 does.
+
+All of the user's matches are ranked, in the index, and the best
+SEARCH_CANDIDATES of them are returned (and paged through). An old post is
+never out of reach for its age, only for being a worse match than that many
+others; more words narrow it down. The cost grows with the number of
+matches: a few ms for a rare word, ~0.6 s on SQLite for one that is in each
+of 100k posts.
+
+Note for SQLite: the FTS rows are keyed by main_post's rowid, which VACUUM
+may renumber; run `INSERT INTO main_post_fts(main_post_fts) VALUES('rebuild')`
+after one.
+"""
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from .models import Post
+
+TABLE = Post._meta.db_table
+FTS_TABLE = f'{TABLE}_fts'
+TS_CONFIG = 'english'
+SEARCH_CANDIDATES = getattr(settings, 'SEARCH_CANDIDATES', 1000)
+
+
+def _fts5_query(query):
+    """User input as an FTS5 query: every word must match (stemmed, like the index)."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_posts(user, query):
+    """
+    `user`'s posts matching `query`, annotated with `rank` (higher is a
+    better match). Unordered; none for an empty query.
+    """
+    posts = Post.objects.filter(user=user)
+    query = (query or '').strip()
+    if connection.vendor == 'postgresql':
+        # Unqualified columns: the first query runs as a subquery with its own alias
+        tsquery = f"websearch_to_tsquery('{TS_CONFIG}', %s)"
+        matches = posts.filter(RawSQL(f"search_vector @@ {tsquery}", [query], output_field=BooleanField()))
+        rank = RawSQL(f"ts_rank(search_vector, {tsquery})", [query], output_field=FloatField())
+        best = matches.annotate(rank=rank).order_by('-rank').values('pk')[:SEARCH_CANDIDATES]
+        return Post.objects.filter(pk__in=best).annotate(rank=rank)
+
+    if connection.vendor == 'sqlite':
+        match = _fts5_query(query)
+        if match is None:
+            return posts.none()
+        # The user's best matches as ranked by the index (lower rank is better)
+        best = (
+            f"SELECT {FTS_TABLE}.rowid AS rid, -{FTS_TABLE}.rank AS score FROM {FTS_TABLE} "
+            f"JOIN {TABLE} p ON p.rowid = {FTS_TABLE}.rowid "
+            f"WHERE {FTS_TABLE} MATCH %s AND p.user_id = %s ORDER BY {FTS_TABLE}.rank LIMIT %s"
+        )
+        params = [match, user.pk, SEARCH_CANDIDATES]
+        return posts.filter(
+            RawSQL(f"{TABLE}.rowid IN (SELECT rid FROM ({best}))", params, output_field=BooleanField())
+        ).annotate(rank=RawSQL(f"SELECT score FROM ({best}) WHERE rid = {TABLE}.rowid", params,
+                               output_field=FloatField()))
+
+    if not query:
+        return posts.none()
+    return posts.filter(Q(title__icontains=query) | Q(search_text__icontains=query)).annotate(
+        rank=Value(0.0, output_field=FloatField()))
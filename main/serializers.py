@@ -1,7 +1,32 @@
 from rest_framework import serializers
-from .models import Post
+from .models import Post, GenerationJob
 from django.utils import timezone
 
+
+def time_ago(created, now=None):
+    """How long ago `created` was, e.g. "3 hours ago" """
+    delta = (now or timezone.now()) - created
+    seconds = delta.total_seconds()
+
+    if seconds < 60:
+        return "just now"
+    elif seconds < 3600:  # 1 hour
+        minutes = int(seconds // 60)
+        return f"{minutes} mins ago"
+    elif seconds < 86400:  # 1 day
+        hours = int(seconds // 3600)
+        return f"{hours} hours ago"
+    elif seconds < 2592000:  # 30 days
+        days = int(seconds // 86400)
+        return f"{days} days ago"
+    elif seconds < 31536000:  # 365 days
+        months = int(seconds // 2592000)
+        return f"{months} months ago"
+    else:
+        years = int(seconds // 31536000)
+        return f"{years} years ago"
+
+
 class PostSerializer(serializers.ModelSerializer):
     time_ago = serializers.SerializerMethodField()
     class Meta:
@@ -10,24 +35,21 @@ class PostSerializer(serializers.ModelSerializer):
         read_only_fields = ['user', 'created', 'length']
 
     def get_time_ago(self, obj):
-        now = timezone.now()
-        delta = now - obj.created
-        seconds = delta.total_seconds()
-
-        if seconds < 60:
-            return "just now"
-        elif seconds < 3600:  # 1 hour
-            minutes = int(seconds // 60)
-            return f"{minutes} mins ago"
-        elif seconds < 86400:  # 1 day
-            hours = int(seconds // 3600)
-            return f"{hours} hours ago"
-        elif seconds < 2592000:  # 30 days
-            days = int(seconds // 86400)
-            return f"{days} days ago"
-        elif seconds < 31536000:  # 365 days
-            months = int(seconds // 2592000)
-            return f"{months} months ago"
-        else:
-            years = int(seconds // 31536000)
-            return f"{years} years ago"
+        return time_ago(obj.created)
+
+
+class PostListSerializer(PostSerializer):
+    """Post cards: the excerpt instead of the full content"""
+    class Meta(PostSerializer.Meta):
+        fields = ['id', 'title', 'created', 'excerpt', 'length', 'time_ago', 'edited']
+
+# Columns PostListSerializer reads, plus `updated` for the ETag
+POST_LIST_FIELDS = ['id', 'title', 'created', 'excerpt', 'length', 'edited', 'updated']
+
+
+class GenerationJobSerializer(serializers.ModelSerializer):
+    post = PostSerializer(read_only=True)
+    class Meta:
+        model = GenerationJob
+        fields = ['id', 'kind', 'status', 'attempts', 'error', 'post', 'created', 'updated']
+        read_only_fields = fields
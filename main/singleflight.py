@@ -0,0 +1,137 @@
+# singleflight.py
+import asyncio
+import hashlib
+import pickle
+import threading
+import time
+import uuid
+from django.core.cache import caches
+from . import metrics
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _published_error(error):
+    """Cache entry for a leader's exception: the exception itself when it survives pickling"""
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return ('unshared', None)
+    return ('error', error)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one upstream call.
+
+    The first caller for a key runs the function; callers arriving while it
+    is in flight wait and share its result (or exception). Counters:
+    `<name>.upstream` for calls actually made, `<name>.shared` for calls saved.
+
+    With `alias` set, callers in other worker processes are coalesced too,
+    using the Django cache as the lock and result store. A failed leader
+    publishes its exception, re-raised as is by the followers; one that
+    can't be pickled makes them run the call themselves.
+    """
+
+    def __init__(self, name, alias=None, timeout=120, poll_interval=0.1):
+        self.name = name
+        self.alias = alias
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self._calls = {}
+        self._async_calls = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        return hashlib.sha1('\x00'.join(str(p) for p in parts).encode()).hexdigest()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.event.wait()
+            metrics.incr(f'{self.name}.shared')
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.alias:
+                call.result = self._do_shared(key, fn)
+            else:
+                metrics.incr(f'{self.name}.upstream')
+                call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def _do_shared(self, key, fn):
+        cache = caches[self.alias]
+        lock_key = f'sf:{self.name}:{key}'
+        token = uuid.uuid4().hex
+
+        if cache.add(lock_key, token, timeout=self.timeout):
+            try:
+                metrics.incr(f'{self.name}.upstream')
+                result = fn()
+            except Exception as e:
+                cache.set(f'{lock_key}:{token}', _published_error(e), timeout=self.timeout)
+                raise
+            else:
+                cache.set(f'{lock_key}:{token}', ('ok', result), timeout=self.timeout)
+                return result
+            finally:
+                cache.delete(lock_key)
+
+        # Another worker holds the flight: wait for its result
+        deadline = time.monotonic() + self.timeout
+        leader_token = cache.get(lock_key)
+        while leader_token and time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = cache.get(f'{lock_key}:{leader_token}')
+            if entry is not None:
+                metrics.incr(f'{self.name}.shared')
+                outcome, value = entry
+                if outcome == 'error':
+                    raise value
+                if outcome == 'ok':
+                    return value
+                break  # Leader failed with an error that couldn't be shared
+            if cache.get(lock_key) != leader_token:
+                break  # Leader gone without publishing a result
+
+        metrics.incr(f'{self.name}.upstream')
+        return fn()
+
+    async def ado(self, key, afn):
+        """Async variant, coalescing coroutines on the current event loop."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        task = self._async_calls.get(flight_key)
+        if task is not None:
+            metrics.incr(f'{self.name}.shared')
+            return await asyncio.shield(task)
+
+        metrics.incr(f'{self.name}.upstream')
+        task = self._async_calls[flight_key] = asyncio.ensure_future(afn())
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self._async_calls.get(flight_key) is task:
+                del self._async_calls[flight_key]
@@ -0,0 +1,168 @@
+# streaming.py
+import json
+import re
+import logging
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from . import generation
+
+logger = logging.getLogger(__name__)
+
+
+def sse_event(event, data):
+    """Format a single Server-Sent Event with a JSON encoded payload."""
+    payload = json.dumps(data, cls=JSONEncoder)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets `Accept: text/event-stream` clients through content negotiation.
+
+    Regular (non streamed) responses such as validation errors are sent as a
+    single `message` event.
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return sse_event('message', data).encode(self.charset)
+
+
+class JSONStringFieldStream:
+    """
+    Incrementally pulls the value of one string field out of a JSON document
+    while it is still being streamed by the model.
+
+    feed() returns the newly decoded part of the field value (possibly empty).
+    """
+    ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+    def __init__(self, field):
+        self._start = re.compile(r'"%s"\s*:\s*"' % re.escape(field))
+        self._buffer = ''
+        self._inside = False
+        self.done = False
+
+    def feed(self, text):
+        if self.done:
+            return ''
+        self._buffer += text
+
+        if not self._inside:
+            match = self._start.search(self._buffer)
+            if not match:
+                # Keep just enough of the tail to match a key split across chunks
+                self._buffer = self._buffer[-64:]
+                return ''
+            self._inside = True
+            self._buffer = self._buffer[match.end():]
+
+        buf = self._buffer
+        out = []
+        i = 0
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '\\':
+                if i + 1 >= len(buf):
+                    break  # Escape split across chunks, wait for more
+                esc = buf[i + 1]
+                if esc == 'u':
+                    if i + 6 > len(buf):
+                        break
+                    try:
+                        out.append(chr(int(buf[i + 2:i + 6], 16)))
+                    except ValueError:
+                        pass
+                    i += 6
+                    continue
+                out.append(self.ESCAPES.get(esc, esc))
+                i += 2
+                continue
+            if ch == '"':
+                self.done = True
+                i += 1
+                break
+            out.append(ch)
+            i += 1
+
+        self._buffer = buf[i:]
+        return ''.join(out)
+
+
+def post_event_stream(prompt, save, serializer_class):
+    """
+    Generate a post from `prompt`, streaming its `content` field as `content`
+    events. Once the model is done the full response is parsed, handed to
+    `save(generated_data)` and the saved post is sent as a final `done` event.
+    """
+    field = JSONStringFieldStream('content')
+    chunks = []
+    try:
+        for text in generation.generate_stream(prompt):
+            chunks.append(text)
+            delta = field.feed(text)
+            if delta:
+                yield sse_event('content', delta)
+
+        generated_data = generation.extract_json(''.join(chunks))
+        post = _save(save, generated_data)
+        yield sse_event('done', serializer_class(post).data)
+    except KeyError as e:
+        yield sse_event('error', {'error': f'Missing required field: {str(e)}'})
+    except Exception as e:
+        logger.error(f"Streaming generation failed: {e}")
+        yield sse_event('error', {'error': str(e)})
+
+
+def _save(save, generated_data):
+    """
+    save(generated_data), with the thread's database connections checked
+    before and after. Under ASGI this runs in whichever executor thread
+    pulled the last chunk, and request_finished only cleans up the
+    request's own thread.
+    """
+    close_old_connections()
+    try:
+        return save(generated_data)
+    finally:
+        close_old_connections()
+
+
+async def _iterate_in_thread(iterator):
+    # Pull each chunk from the blocking iterator in a worker thread so the
+    # ASGI server can flush it immediately instead of buffering the response.
+    sentinel = object()
+    iterator = iter(iterator)
+    while True:
+        chunk = await sync_to_async(next, thread_sensitive=False)(iterator, sentinel)
+        if chunk is sentinel:
+            break
+        yield chunk
+
+
+def event_stream_response(request, events):
+    """
+    Wrap an iterator of SSE strings in a StreamingHttpResponse.
+
+    Under ASGI (metag/asgi.py) the events are forwarded as they are produced;
+    Django would otherwise consume a sync iterator in full before sending it.
+    """
+    if isinstance(getattr(request, '_request', request), ASGIRequest):
+        events = _iterate_in_thread(events)
+
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
+def wants_stream(request):
+    return request.query_params.get('stream') in ('1', 'true')
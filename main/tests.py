@@ -1,3 +1,136 @@
-from django.test import TestCase
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+from unittest import skipIf
+from django.test import SimpleTestCase
+from . import anti_ddos, generation, llm
 
-# Create your tests here.
+
+class RecordingClient(llm.LLMClient):
+    """Answers like the fake backend, instantly, and keeps the size of every prompt"""
+
+    def __init__(self):
+        self.fake = llm.FakeClient(latency=0, tokens_per_second=0)
+        self.prompt_sizes = []
+
+    def generate(self, prompt):
+        self.prompt_sizes.append(len(prompt))
+        return self.fake.respond(prompt)
+
+
+class StatelessGenerationTests(SimpleTestCase):
+    REQUESTS = 3000
+
+    def setUp(self):
+        self.previous = llm._client
+        self.client = RecordingClient()
+        llm.set_client(self.client)
+
+    def tearDown(self):
+        llm.set_client(self.previous)
+
+    def test_clip_source_bounds_the_prompt(self):
+        base = len(generation.youtube_post_prompt('', 'casual'))
+        transcript = 'word ' * generation.MAX_SOURCE_CHARS
+        prompt = generation.youtube_post_prompt(transcript, 'casual')
+        self.assertLessEqual(len(prompt), base + generation.MAX_SOURCE_CHARS)
+        self.assertEqual(generation.clip_source('short'), 'short')
+
+    def test_prompt_size_stays_flat(self):
+        for i in range(self.REQUESTS):
+            data = generation.generate_json(generation.text_post_prompt(f'topic {i:06d}', 'casual'))
+            self.assertIn('content', data)
+
+        sizes = self.client.prompt_sizes
+        self.assertEqual(len(sizes), self.REQUESTS)
+        # Each request sends its own prompt only: no history piles up
+        self.assertEqual(min(sizes), max(sizes))
+        self.assertEqual(sizes[0], len(generation.text_post_prompt('topic 000000', 'casual')))
+
+    def test_memory_stays_flat(self):
+        transcript = 'spoken words ' * 20000
+
+        def run(start, count):
+            for i in range(start, start + count):
+                prompt = generation.youtube_post_prompt(f'{i} {transcript}', 'casual')
+                generation.generate_json(prompt)
+
+        run(0, 200)  # Warm up lazily built state (client, counters, ...)
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            run(200, self.REQUESTS)
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        # A leaked prompt alone would be ~60 KB; thousands of them would be MBs
+        self.assertLess(after - before, 256 * 1024)
+
+
+def hammer_limiter(path, now, requests, barrier, results):
+    """One worker process: `requests` hits on one IP, at the same time as the others"""
+    limiter = anti_ddos.SharedMemoryLimiter(anti_ddos.ANTI_DDOS_RATE, anti_ddos.ANTI_DDOS_WINDOW, path, 1024)
+    barrier.wait()
+    results.put(sum(limiter.hit('203.0.113.7', now) for _ in range(requests)))
+
+
+@skipIf(anti_ddos.fcntl is None, "SharedMemoryLimiter needs fcntl")
+class SharedMemoryLimiterTests(SimpleTestCase):
+    PROCESSES = 8
+    WINDOW = 60
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'anti-ddos')
+        # Middle of a window, so an empty previous window weighs half
+        self.now = (int(time.time() / self.WINDOW) + 0.5) * self.WINDOW
+
+    def limiter(self, limit, buckets=1024):
+        return anti_ddos.SharedMemoryLimiter(limit, self.WINDOW, self.path, buckets)
+
+    def hits(self, limiter, key, count, now):
+        return sum(limiter.hit(key, now) for _ in range(count))
+
+    def test_processes_share_the_limit_exactly(self):
+        context = multiprocessing.get_context('fork')
+        barrier, results = context.Barrier(self.PROCESSES), context.Queue()
+        now = (int(time.time() / anti_ddos.ANTI_DDOS_WINDOW) + 0.5) * anti_ddos.ANTI_DDOS_WINDOW
+        workers = [context.Process(target=hammer_limiter,
+                                   args=(self.path, now, anti_ddos.ANTI_DDOS_RATE, barrier, results))
+                   for _ in range(self.PROCESSES)]
+        for worker in workers:
+            worker.start()
+        allowed = [results.get(timeout=60) for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        # Each process alone could have taken the whole limit
+        self.assertEqual(sum(allowed), anti_ddos.ANTI_DDOS_RATE)
+
+    def test_window_rollover(self):
+        limiter = self.limiter(10)
+        self.assertEqual(self.hits(limiter, 'ip', 15, self.now), 10)
+        # Start of the next window: the full previous one still counts
+        self.assertEqual(self.hits(limiter, 'ip', 5, self.now + self.WINDOW / 2), 0)
+        # Halfway through it, half of it does
+        self.assertEqual(self.hits(limiter, 'ip', 10, self.now + self.WINDOW), 5)
+        # Idle for two windows: nothing left
+        self.assertEqual(self.hits(limiter, 'ip', 15, self.now + 3 * self.WINDOW), 10)
+
+    def test_slot_eviction(self):
+        limiter = self.limiter(3, buckets=1)  # One bucket: 8 slots for every IP
+        later = self.now + self.WINDOW
+        self.assertEqual(self.hits(limiter, 'ip0', 3, self.now), 3)
+        for n in range(1, 8):
+            self.assertEqual(self.hits(limiter, f'ip{n}', 3, later), 3)
+
+        # A ninth IP takes the slot idle the longest, ip0's
+        self.assertEqual(self.hits(limiter, 'ip8', 5, later), 3)
+        # So ip0 starts from zero: 3 requests, where half of its previous
+        # window (1.5) would have left room for 2
+        self.assertEqual(self.hits(limiter, 'ip0', 5, later), 3)
+        # The IPs that kept a slot kept their counts (ip0 took ip1's)
+        self.assertEqual(self.hits(limiter, 'ip7', 1, later), 0)
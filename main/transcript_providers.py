@@ -0,0 +1,491 @@
+# transcript_providers.py
+"""
+Transcript providers and the hedged chain that queries them.
+
+The chain asks the first provider and, if it hasn't answered within its
+hedge delay (the p95 of its recent successful latencies), fires the same
+request at the next provider too. The first good transcript wins and the
+requests still in flight are cancelled; a provider failing starts the next
+one right away.
+
+Providers are picked by name with TRANSCRIPT_PROVIDERS; set_providers()
+swaps them (e.g. for StubProvider) in tests and load tests.
+
+Counters per provider: `transcript.<name>.ok`, `.failed`, `.won`, plus
+`transcript.hedged` for hedge requests fired.
+
+With TRANSCRIPT_USE_PROXIES, the keyless YouTube scrapers
+(youtube-transcript-api, yt-dlp) go through proxy_pool; Supadata never does,
+its requests carry the API key.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from . import metrics, outbound, proxy_pool
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_PROVIDERS = getattr(settings, 'TRANSCRIPT_PROVIDERS', ['supadata', 'youtube_transcript_api', 'yt_dlp'])
+TRANSCRIPT_LANGUAGES = getattr(settings, 'TRANSCRIPT_LANGUAGES', ['en'])
+TRANSCRIPT_TIMEOUT = outbound.timeout(read=getattr(settings, 'TRANSCRIPT_TIMEOUT', 30))
+TRANSCRIPT_USE_PROXIES = getattr(settings, 'TRANSCRIPT_USE_PROXIES', False)
+
+# Hedge delay: p95 of the provider's recent latencies, within these bounds.
+# Until HEDGE_MIN_SAMPLES answers were seen, HEDGE_DEFAULT_DELAY is used.
+HEDGE_DEFAULT_DELAY = getattr(settings, 'TRANSCRIPT_HEDGE_DELAY', 3.0)  # seconds
+HEDGE_MIN_DELAY = getattr(settings, 'TRANSCRIPT_HEDGE_MIN_DELAY', 0.5)
+HEDGE_MAX_DELAY = getattr(settings, 'TRANSCRIPT_HEDGE_MAX_DELAY', 10.0)
+HEDGE_MIN_SAMPLES = 10
+LATENCY_WINDOW = 200
+
+SUPADATA_TRANSCRIPT_URL = "https://api.supadata.ai/v1/youtube/transcript"
+
+# segments: [start, duration, text] in seconds, in order ([] when the
+# provider has no timing). chapters: [{title, start, end}] or None (unknown).
+FetchedTranscript = namedtuple('FetchedTranscript', 'text language segments chapters', defaults=((), None))
+
+
+def from_segments(segments, language, chapters=None):
+    segments = [[round(start, 3), round(duration, 3), text.strip()]
+                for start, duration, text in segments if text and text.strip()]
+    return FetchedTranscript(' '.join(text for _, _, text in segments), language, segments, chapters)
+
+
+class TranscriptUnavailable(Exception):
+    """The provider could not produce a transcript for this video."""
+
+
+def watch_url(vid):
+    return f"https://www.youtube.com/watch?v={vid}"
+
+
+def _choose_proxy():
+    return proxy_pool.choose() if TRANSCRIPT_USE_PROXIES else None
+
+
+class TranscriptProvider:
+    name = None
+
+    def fetch(self, vid):
+        """Return a FetchedTranscript or raise TranscriptUnavailable."""
+        raise NotImplementedError
+
+    async def afetch(self, vid):
+        return await sync_to_async(self.fetch, thread_sensitive=False)(vid)
+
+
+class SupadataProvider(TranscriptProvider):
+    name = 'supadata'
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def _request_options(self, vid):
+        return {
+            'params': {'url': watch_url(vid)},  # Timestamped segments
+            'headers': {"x-api-key": self.api_key},
+            'timeout': TRANSCRIPT_TIMEOUT,
+        }
+
+    @staticmethod
+    def _parse(response):
+        response.raise_for_status()
+        data = response.json()
+        content = data.get('content')
+        if isinstance(content, str):
+            fetched = FetchedTranscript(content.strip(), data.get('lang') or '')
+        elif isinstance(content, list):
+            # Offsets and durations are in milliseconds
+            fetched = from_segments(((item.get('offset', 0) / 1000, item.get('duration', 0) / 1000, item.get('text', ''))
+                                     for item in content), data.get('lang') or '')
+        else:
+            fetched = None
+        if not fetched or not fetched.text:
+            raise TranscriptUnavailable("Supadata returned no transcript")
+        return fetched
+
+    def fetch(self, vid):
+        try:
+            return self._parse(outbound.get(SUPADATA_TRANSCRIPT_URL, **self._request_options(vid)))
+        except (httpx.HTTPError, ValueError) as e:
+            raise TranscriptUnavailable(str(e)) from e
+
+    async def afetch(self, vid):
+        try:
+            return self._parse(await outbound.aget(SUPADATA_TRANSCRIPT_URL, **self._request_options(vid)))
+        except (httpx.HTTPError, ValueError) as e:
+            raise TranscriptUnavailable(str(e)) from e
+
+
+class YouTubeTranscriptApiProvider(TranscriptProvider):
+    """Captions straight from YouTube via youtube-transcript-api (no API key)."""
+    name = 'youtube_transcript_api'
+
+    def fetch(self, vid):
+        from youtube_transcript_api import YouTubeTranscriptApi
+        from youtube_transcript_api._errors import (CouldNotRetrieveTranscript, TooManyRequests,
+                                                    YouTubeRequestFailed)
+
+        proxy = _choose_proxy()
+        proxies = {'http': proxy.url, 'https': proxy.url} if proxy else None
+        started = time.monotonic()
+        try:
+            transcripts = YouTubeTranscriptApi.list_transcripts(vid, proxies=proxies)
+            try:
+                transcript = transcripts.find_transcript(TRANSCRIPT_LANGUAGES)
+            except CouldNotRetrieveTranscript:
+                transcript = next(iter(transcripts))  # Manually created ones come first
+            segments = transcript.fetch()
+        except (TooManyRequests, YouTubeRequestFailed, requests.exceptions.RequestException) as e:
+            # Blocked, rate limited or unreachable: the route's fault, not the video's
+            proxy_pool.report(proxy, False)
+            raise TranscriptUnavailable(str(e) or 'Request failed') from e
+        except (CouldNotRetrieveTranscript, StopIteration) as e:
+            proxy_pool.report(proxy, True, time.monotonic() - started)
+            raise TranscriptUnavailable(str(e) or 'No transcript') from e
+        proxy_pool.report(proxy, True, time.monotonic() - started)
+
+        fetched = from_segments(((segment['start'], segment['duration'], segment['text']) for segment in segments),
+                                transcript.language_code)
+        if not fetched.text:
+            raise TranscriptUnavailable("Empty transcript")
+        return fetched
+
+
+class YtDlpProvider(TranscriptProvider):
+    """Subtitles / automatic captions listed by yt-dlp, in YouTube's json3 format."""
+    name = 'yt_dlp'
+
+    options = {
+        'skip_download': True,
+        'quiet': True,
+        'no_warnings': True,
+        'socket_timeout': 15,
+    }
+
+    def _extract_info(self, vid):
+        import yt_dlp
+
+        proxy = _choose_proxy()
+        options = {**self.options, 'proxy': proxy.url} if proxy else self.options
+        started = time.monotonic()
+        try:
+            with yt_dlp.YoutubeDL(options) as ydl:
+                info = ydl.extract_info(watch_url(vid), download=False)
+        except yt_dlp.utils.YoutubeDLError as e:
+            # yt-dlp doesn't tell network errors from unavailable videos apart
+            proxy_pool.report(proxy, False)
+            raise TranscriptUnavailable(str(e)) from e
+        proxy_pool.report(proxy, True, time.monotonic() - started)
+        return info or {}
+
+    @staticmethod
+    def _pick_track(info):
+        for tracks in (info.get('subtitles') or {}, info.get('automatic_captions') or {}):
+            for language in TRANSCRIPT_LANGUAGES:
+                if language in tracks:
+                    return language, tracks[language]
+        for tracks in (info.get('subtitles') or {}, info.get('automatic_captions') or {}):
+            for language, formats in tracks.items():
+                if language != 'live_chat':
+                    return language, formats
+        return None, []
+
+    def fetch(self, vid):
+        info = self._extract_info(vid)
+        language, formats = self._pick_track(info)
+        track = next((f for f in formats if f.get('ext') == 'json3'), None)
+        if track is None:
+            raise TranscriptUnavailable("No json3 caption track")
+
+        try:
+            response = outbound.get(track['url'], timeout=TRANSCRIPT_TIMEOUT)
+            response.raise_for_status()
+            events = response.json().get('events', [])
+        except (httpx.HTTPError, ValueError) as e:
+            raise TranscriptUnavailable(str(e)) from e
+
+        fetched = from_segments(
+            ((event.get('tStartMs', 0) / 1000, event.get('dDurationMs', 0) / 1000,
+              ' '.join(''.join(seg.get('utf8', '') for seg in event.get('segs') or ()).split()))
+             for event in events),
+            language, self.chapters(info))
+        if not fetched.text:
+            raise TranscriptUnavailable("Empty transcript")
+        return fetched
+
+    @staticmethod
+    def chapters(info):
+        return [{'title': chapter.get('title') or '', 'start': chapter['start_time'], 'end': chapter['end_time']}
+                for chapter in info.get('chapters') or ()]
+
+    def fetch_chapters(self, vid):
+        """Chapters of the video (from its description), [] when it has none."""
+        return self.chapters(self._extract_info(vid))
+
+
+class StubProvider(TranscriptProvider):
+    """
+    Local stand-in for tests and load tests.
+
+    Args:
+        name (str): Name used in the stats.
+        latency (float): Seconds before answering.
+        failure_rate (float): Fraction of calls raising TranscriptUnavailable.
+        seed (int): Seed for the failure draws.
+        language (str): Language code of the returned transcripts.
+    """
+
+    def __init__(self, name='stub', latency=0.1, failure_rate=0.0, seed=0, language='en'):
+        self.name = name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.language = language
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _answer(self, vid):
+        with self._lock:
+            failed = self._random.random() < self.failure_rate
+        if failed:
+            raise TranscriptUnavailable(f"Injected {self.name} failure")
+        # One sentence every 10 seconds, in three 3 minute chapters
+        segments = [(n * 10, 10, f"Sentence {n} of {vid} from {self.name}.") for n in range(54)]
+        return from_segments(segments, self.language, self.fetch_chapters(vid))
+
+    def fetch_chapters(self, vid):
+        return [{'title': f'Chapter {n + 1}', 'start': n * 180, 'end': (n + 1) * 180} for n in range(3)]
+
+    def fetch(self, vid):
+        time.sleep(self.latency)
+        return self._answer(vid)
+
+    async def afetch(self, vid):
+        await asyncio.sleep(self.latency)
+        return self._answer(vid)
+
+
+class ProviderStats:
+    """Per-process success counts and recent latencies of one provider."""
+
+    def __init__(self, name):
+        self.name = name
+        self.ok = 0
+        self.failed = 0
+        self.won = 0
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds, ok):
+        with self._lock:
+            if ok:
+                self.ok += 1
+                self._latencies.append(seconds)
+            else:
+                self.failed += 1
+        metrics.incr(f'transcript.{self.name}.{"ok" if ok else "failed"}')
+
+    def record_win(self):
+        with self._lock:
+            self.won += 1
+        metrics.incr(f'transcript.{self.name}.won')
+
+    def percentile(self, q):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def hedge_delay(self):
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return min(max(self.percentile(0.95), HEDGE_MIN_DELAY), HEDGE_MAX_DELAY)
+
+    def snapshot(self):
+        calls = self.ok + self.failed
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            'ok': self.ok,
+            'failed': self.failed,
+            'won': self.won,
+            'success_rate': round(self.ok / calls, 3) if calls else None,
+            'p50': round(p50, 3) if p50 is not None else None,
+            'p95': round(p95, 3) if p95 is not None else None,
+            'hedge_delay': round(self.hedge_delay(), 3),
+        }
+
+
+class HedgedChain:
+    """Queries `providers` in order with hedging; see the module docstring."""
+
+    def __init__(self, providers, max_workers=8):
+        self.providers = list(providers)
+        self.stats = {provider.name: ProviderStats(provider.name) for provider in self.providers}
+        # Sync fetches run in these threads; a losing call can't be interrupted
+        # there, so it finishes in the background and its answer is dropped
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='transcript')
+
+    @staticmethod
+    def _unavailable(provider, error):
+        """Any provider failure as TranscriptUnavailable, so the chain moves on"""
+        if isinstance(error, TranscriptUnavailable):
+            return error
+        # A changed upstream payload (KeyError, JSONDecodeError, ...) or a library bug
+        logger.warning(f"Transcript provider {provider.name} failed unexpectedly: {error!r}")
+        return TranscriptUnavailable(f"unexpected error: {error!r}")
+
+    def _timed(self, provider, vid):
+        started = time.monotonic()
+        try:
+            result = provider.fetch(vid)
+        except Exception as e:
+            self.stats[provider.name].record(time.monotonic() - started, ok=False)
+            raise self._unavailable(provider, e)
+        self.stats[provider.name].record(time.monotonic() - started, ok=True)
+        return result
+
+    async def _atimed(self, provider, vid):
+        started = time.monotonic()
+        try:
+            result = await provider.afetch(vid)
+        except Exception as e:
+            self.stats[provider.name].record(time.monotonic() - started, ok=False)
+            raise self._unavailable(provider, e)
+        self.stats[provider.name].record(time.monotonic() - started, ok=True)
+        return result
+
+    def _wait_time(self, last_provider, launched_at, remaining):
+        """Seconds to wait before hedging with the next provider (None: no more providers)."""
+        if not remaining:
+            return None
+        return max(0.0, launched_at + self.stats[last_provider.name].hedge_delay() - time.monotonic())
+
+    def fetch(self, vid):
+        remaining = list(self.providers)
+        pending = {}
+        errors = []
+
+        def launch():
+            provider = remaining.pop(0)
+            pending[self._executor.submit(self._timed, provider, vid)] = provider
+            return provider, time.monotonic()
+
+        last, launched_at = launch()
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=self._wait_time(last, launched_at, remaining),
+                               return_when=FIRST_COMPLETED)
+                if not done:
+                    metrics.incr('transcript.hedged')
+                    last, launched_at = launch()
+                    continue
+
+                for future in done:
+                    provider = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except TranscriptUnavailable as e:
+                        errors.append(f"{provider.name}: {e}")
+                        if remaining:
+                            last, launched_at = launch()
+                        continue
+                    self.stats[provider.name].record_win()
+                    return result
+        finally:
+            for future in pending:
+                future.cancel()
+
+        raise TranscriptUnavailable('; '.join(errors))
+
+    async def afetch(self, vid):
+        remaining = list(self.providers)
+        pending = {}
+        errors = []
+
+        def launch():
+            provider = remaining.pop(0)
+            pending[asyncio.ensure_future(self._atimed(provider, vid))] = provider
+            return provider, time.monotonic()
+
+        last, launched_at = launch()
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=self._wait_time(last, launched_at, remaining),
+                                             return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    metrics.incr('transcript.hedged')
+                    last, launched_at = launch()
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    try:
+                        result = task.result()
+                    except TranscriptUnavailable as e:
+                        errors.append(f"{provider.name}: {e}")
+                        if remaining:
+                            last, launched_at = launch()
+                        continue
+                    self.stats[provider.name].record_win()
+                    return result
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise TranscriptUnavailable('; '.join(errors))
+
+    def fetch_chapters(self, vid):
+        """Chapters from the first provider able to list them, [] when none can."""
+        errors = []
+        for provider in self.providers:
+            if hasattr(provider, 'fetch_chapters'):
+                try:
+                    return provider.fetch_chapters(vid)
+                except Exception as e:
+                    errors.append(f"{provider.name}: {self._unavailable(provider, e)}")
+        if errors:
+            raise TranscriptUnavailable('; '.join(errors))
+        return []
+
+    def snapshot(self):
+        return {name: stats.snapshot() for name, stats in self.stats.items()}
+
+
+PROVIDER_FACTORIES = {
+    'supadata': lambda: SupadataProvider(settings.SUPA_DATA_KEY),
+    'youtube_transcript_api': YouTubeTranscriptApiProvider,
+    'yt_dlp': YtDlpProvider,
+    'stub': StubProvider,
+}
+
+_chain = None
+_chain_lock = threading.Lock()
+
+
+def get_chain():
+    """Return the process-wide chain built from settings.TRANSCRIPT_PROVIDERS."""
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                try:
+                    providers = [PROVIDER_FACTORIES[name]() for name in TRANSCRIPT_PROVIDERS]
+                except KeyError as e:
+                    raise ValueError(f"Unknown transcript provider: {e.args[0]}")
+                _chain = HedgedChain(providers)
+    return _chain
+
+
+def set_providers(providers):
+    """Swap the provider chain (tests, load tests, shell experiments)."""
+    global _chain
+    _chain = HedgedChain(providers)
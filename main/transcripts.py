@@ -0,0 +1,228 @@
+# transcripts.py
+"""
+YouTube transcripts, stored in the database by canonical video id.
+
+A published video's transcript doesn't change, so every URL form of the
+same video (youtu.be/X, watch?v=X&t=30, shorts/X, embed/X, ...) resolves to
+one row and the providers (Supadata is paid per call) are only asked once
+per video. See transcript_providers.py for how they are queried.
+
+Only the selected time range / chapters of a transcript need to go into
+a prompt, so the timestamped segments are kept as well (select()).
+
+Counters: `transcript.hit` (served from the database), `transcript.miss`,
+`transcript.selected`.
+Transcript.hits keeps the number of provider calls avoided per video.
+"""
+import logging
+import math
+import re
+from collections import namedtuple
+from urllib.parse import parse_qs, urlsplit
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from . import metrics
+from .models import Transcript
+from .transcript_providers import TranscriptUnavailable, get_chain
+
+logger = logging.getLogger(__name__)
+
+# Part of a video to generate from; see parse_selection()
+Selection = namedtuple('Selection', 'start end chapters')
+
+VIDEO_ID = re.compile(r'^[A-Za-z0-9_-]{11}$')
+YOUTUBE_HOSTS = {'youtube.com', 'www.youtube.com', 'm.youtube.com', 'music.youtube.com',
+                 'youtube-nocookie.com', 'www.youtube-nocookie.com'}
+# youtube.com/<prefix>/<id>
+PATH_PREFIXES = {'shorts', 'embed', 'live', 'v', 'e'}
+
+
+def video_id(url):
+    """The 11 character video id of a YouTube URL, or None."""
+    url = (url or '').strip()
+    if '://' not in url:
+        url = '//' + url
+    parts = urlsplit(url)
+    host = (parts.hostname or '').lower()
+    segments = [s for s in parts.path.split('/') if s]
+
+    candidate = None
+    if host in ('youtu.be', 'www.youtu.be') and segments:
+        candidate = segments[0]
+    elif host in YOUTUBE_HOSTS:
+        if segments[:1] == ['watch']:
+            candidate = parse_qs(parts.query).get('v', [None])[0]
+        elif len(segments) >= 2 and segments[0] in PATH_PREFIXES:
+            candidate = segments[1]
+
+    if candidate and VIDEO_ID.match(candidate):
+        return candidate
+    return None
+
+
+def _store(vid, fetched):
+    transcript = Transcript(video_id=vid, data=Transcript.compress(fetched.text),
+                            language=fetched.language, chapters=fetched.chapters)
+    transcript.set_segments(fetched.segments)
+    try:
+        with transaction.atomic():
+            transcript.save(force_insert=True)
+    except IntegrityError:
+        pass  # Stored by a concurrent request in the meantime
+    return transcript
+
+
+def load(url):
+    """
+    The Transcript row of a YouTube URL: from the database when this video
+    was fetched before, otherwise from the provider chain (and then stored).
+    Raises TranscriptUnavailable when no provider could produce one.
+    """
+    vid = video_id(url)
+    if vid is None:
+        raise TranscriptUnavailable(f"Not a YouTube video URL: {url}")
+
+    transcript = Transcript.objects.filter(pk=vid).first()
+    if transcript is not None:
+        metrics.incr('transcript.hit')
+        Transcript.objects.filter(pk=vid).update(hits=F('hits') + 1)
+        return transcript
+
+    metrics.incr('transcript.miss')
+    return _store(vid, get_chain().fetch(vid))
+
+
+async def aload(url):
+    """Async counterpart of load()."""
+    vid = video_id(url)
+    if vid is None:
+        raise TranscriptUnavailable(f"Not a YouTube video URL: {url}")
+
+    transcript = await Transcript.objects.filter(pk=vid).afirst()
+    if transcript is not None:
+        metrics.incr('transcript.hit')
+        await Transcript.objects.filter(pk=vid).aupdate(hits=F('hits') + 1)
+        return transcript
+
+    metrics.incr('transcript.miss')
+    fetched = await get_chain().afetch(vid)
+    return await sync_to_async(_store)(vid, fetched)
+
+
+def parse_timestamp(value):
+    """Seconds from 90, "90", "1:30" or "1:02:03"."""
+    if isinstance(value, bool):
+        raise ValueError(f"Invalid time: {value}")
+    if isinstance(value, (int, float)):
+        seconds = float(value)
+    else:
+        seconds = 0.0
+        for part in str(value).strip().split(':'):
+            seconds = seconds * 60 + float(part)
+    # float() also takes "nan" and "inf"
+    if not math.isfinite(seconds) or seconds < 0:
+        raise ValueError(f"Invalid time: {value}")
+    return seconds
+
+
+def parse_selection(data):
+    """
+    Selection from request data: `start` / `end` (seconds or [h:]mm:ss) and/or
+    `chapters` (1-based numbers or titles: a list, comma separated, or a
+    single number).
+    None when nothing is selected; ValueError for invalid input.
+    """
+    start, end, chapters = data.get('start'), data.get('end'), data.get('chapters')
+    if start in (None, '') and end in (None, '') and not chapters:
+        return None
+
+    try:
+        start = parse_timestamp(start) if start not in (None, '') else None
+        end = parse_timestamp(end) if end not in (None, '') else None
+    except ValueError:
+        raise ValueError("start / end must be seconds or [hh:]mm:ss")
+    if start is not None and end is not None and end <= start:
+        raise ValueError("end must be after start")
+
+    if isinstance(chapters, str):
+        chapters = chapters.split(',')
+    elif isinstance(chapters, int) and not isinstance(chapters, bool):
+        chapters = [chapters]
+    elif not isinstance(chapters, (list, type(None))):
+        raise ValueError("chapters must be a list, a number or comma separated")
+    chapters = [str(chapter).strip() for chapter in chapters or () if str(chapter).strip()]
+    return Selection(start, end, chapters)
+
+
+def _chapter_ranges(transcript, wanted):
+    if transcript.chapters is None:
+        transcript.chapters = get_chain().fetch_chapters(transcript.video_id)
+        Transcript.objects.filter(pk=transcript.video_id).update(chapters=transcript.chapters)
+    if not transcript.chapters:
+        raise ValueError("This video has no chapters")
+
+    ranges = []
+    for name in wanted:
+        if name.isdigit() and 1 <= int(name) <= len(transcript.chapters):
+            chapter = transcript.chapters[int(name) - 1]
+        else:
+            chapter = next((c for c in transcript.chapters if c['title'].lower() == name.lower()), None)
+        if chapter is None:
+            raise ValueError(f"Unknown chapter: {name}")
+        ranges.append((chapter['start'], chapter['end']))
+    return ranges
+
+
+def _segments(transcript):
+    segments = transcript.segment_list
+    if not segments:
+        # Stored without timestamps (older rows): fetch them once
+        fetched = get_chain().fetch(transcript.video_id)
+        if fetched.segments:
+            transcript.set_segments(fetched.segments)
+            Transcript.objects.filter(pk=transcript.video_id).update(segments=transcript.segments)
+            segments = fetched.segments
+    return segments
+
+
+def select(transcript, selection):
+    """
+    Text of the segments of `transcript` inside the selected time range
+    and/or chapters (their union); the whole text without a selection.
+    Raises ValueError when the selection can't be applied.
+    """
+    if not selection:
+        return transcript.text
+
+    ranges = []
+    if selection.start is not None or selection.end is not None:
+        ranges.append((selection.start or 0, math.inf if selection.end is None else selection.end))
+    if selection.chapters:
+        ranges.extend(_chapter_ranges(transcript, selection.chapters))
+
+    segments = _segments(transcript)
+    if not segments:
+        logger.warning(f"No timestamps for {transcript.video_id}, using the whole transcript")
+        return transcript.text
+
+    picked = [text for start, duration, text in segments
+              if any(start < hi and (start + duration > lo or start >= lo) for lo, hi in ranges)]
+    if not picked:
+        raise ValueError("The selection contains no part of the transcript")
+
+    metrics.incr('transcript.selected')
+    return ' '.join(picked)
+
+
+def stats():
+    """Stored transcripts and calls avoided (all workers), hit rate and
+    provider latency / success rates (this process)."""
+    totals = Transcript.objects.aggregate(avoided=Sum('hits'))
+    hits, misses = metrics.get('transcript.hit'), metrics.get('transcript.miss')
+    return {
+        'transcript.stored': Transcript.objects.count(),
+        'transcript.api_calls_avoided': totals['avoided'] or 0,
+        'transcript.hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+        'transcript.providers': get_chain().snapshot(),
+    }
@@ -0,0 +1,172 @@
+# ttl_cache.py
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from django.core.cache import caches
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+FRESH = 'fresh'
+STALE = 'stale'
+MISS = 'miss'
+
+
+class LocalBackend:
+    """In-process store with LRU eviction once `max_size` entries are held."""
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class DjangoCacheBackend:
+    """
+    Stores entries in a Django cache alias so every worker shares them.
+    Eviction is left to the cache itself (MAX_ENTRIES, redis maxmemory, ...).
+    """
+
+    def __init__(self, alias='default', prefix='ttl'):
+        self.alias = alias
+        self.prefix = prefix
+
+    def _key(self, key):
+        return f"{self.prefix}:{hashlib.sha1(key.encode()).hexdigest()}"
+
+    def get(self, key):
+        return caches[self.alias].get(self._key(key))
+
+    def set(self, key, entry, timeout):
+        caches[self.alias].set(self._key(key), entry, timeout)
+
+    def delete(self, key):
+        caches[self.alias].delete(self._key(key))
+
+
+class TTLCache:
+    """
+    Cache with a TTL and stale-while-revalidate.
+
+    Entries younger than `ttl` are served as is. Entries older than that but
+    within `stale_ttl` more seconds are still served instantly while a single
+    background refresh replaces them. Hits, stale hits and misses are counted
+    in main.metrics under `<name>.hit`, `<name>.stale` and `<name>.miss`.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.backend = backend or LocalBackend()
+        self._refreshing = set()
+        self._refresh_lock = threading.Lock()
+        self._tasks = set()
+
+    def _lookup(self, key):
+        entry = self.backend.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            now = time.time()
+            if now < expires_at:
+                metrics.incr(f'{self.name}.hit')
+                return value, FRESH
+            if now < expires_at + self.stale_ttl:
+                metrics.incr(f'{self.name}.stale')
+                return value, STALE
+        metrics.incr(f'{self.name}.miss')
+        return None, MISS
+
+    def set(self, key, value):
+        self.backend.set(key, (value, time.time() + self.ttl), self.ttl + self.stale_ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def _start_refresh(self, key):
+        with self._refresh_lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _end_refresh(self, key):
+        with self._refresh_lock:
+            self._refreshing.discard(key)
+
+    def _refresh(self, key, compute):
+        try:
+            self.set(key, compute())
+        except Exception as e:
+            logger.warning(f"Background refresh of {self.name} failed: {e}")
+        finally:
+            self._end_refresh(key)
+
+    def get_or_compute(self, key, compute):
+        value, state = self._lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self._start_refresh(key):
+                threading.Thread(target=self._refresh, args=(key, compute), daemon=True).start()
+            return value
+
+        value = compute()
+        self.set(key, value)
+        return value
+
+    async def _arefresh(self, key, acompute):
+        try:
+            self.set(key, await acompute())
+        except Exception as e:
+            logger.warning(f"Background refresh of {self.name} failed: {e}")
+        finally:
+            self._end_refresh(key)
+
+    async def aget_or_compute(self, key, acompute):
+        """Async variant; the background refresh runs as a task on the current loop."""
+        value, state = self._lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self._start_refresh(key):
+                task = asyncio.ensure_future(self._arefresh(key, acompute))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return value
+
+        value = await acompute()
+        self.set(key, value)
+        return value
+
+
+def build_cache(name, ttl, stale_ttl=0, backend='local', max_size=512, alias='default'):
+    """Create a TTLCache from settings-style options (`backend` is 'local' or 'django')."""
+    if backend == 'django':
+        store = DjangoCacheBackend(alias=alias, prefix=name)
+    elif backend == 'local':
+        store = LocalBackend(max_size=max_size)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    return TTLCache(name, ttl, stale_ttl, store)
@@ -1,18 +1,29 @@
 # urls.py
+from django.conf import settings
 from django.urls import path
 from .views import (post_get_delete, post_create_text, post_create_url,
                      post_edit, post_edit_ai, post_create_youtube,
-                   regenerate_post, get_topics, post_list, post_save_editor)
+                   regenerate_post, get_topics, post_list, post_save_editor,
+                   job_detail, metrics_snapshot, post_create_batch, post_search)
+
+if settings.ASYNC_VIEWS:
+    # Serve the LLM / scraping endpoints with native async views (ASGI only)
+    from .async_views import (post_create_text, post_create_url, post_edit_ai,
+                              post_create_youtube, regenerate_post, get_topics)
 
 urlpatterns = [
     path('posts/<uuid:pk>/', post_get_delete, name='post-detail'),
     path('posts/create-text/', post_create_text, name='post-create'),
+    path('posts/create-batch/', post_create_batch, name='post-create-batch'),
     path('posts/edit/<uuid:id>/', post_edit, name='post-edit'),
     path('posts/create-url/', post_create_url, name='post-url'),
     path('posts/create-youtube/', post_create_youtube, name='post-youtube'),
     path('posts/regenerate/<uuid:pk>/', regenerate_post, name='post-regenerate'),
     path('posts/topics/', get_topics, name='post-topics'),
     path('posts/', post_list, name='post-list'),
+    path('posts/search/', post_search, name='post-search'),
     path('posts/save-editor/', post_save_editor, name='post-save'),
     path('posts/edit-ai/', post_edit_ai, name='post-edit-ai'),
+    path('jobs/<uuid:pk>/', job_detail, name='job-detail'),
+    path('metrics/', metrics_snapshot, name='metrics'),
 ]
\ No newline at end of file
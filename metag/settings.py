@@ -1,6 +1,6 @@
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import Csv, config
 import dj_database_url
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "main.anti_ddos.AntiDDoSMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "main.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -153,8 +154,40 @@ REST_FRAMEWORK = {
 }
 
 CORS_ORIGIN_ALLOW_ALL = True
-GEMINI_API_KEY = config('GEMINI_API_KEY')
 
-PROXY_LIST = BASE_DIR / 'proxy/proxies.json'
+# Cache shared by all workers (quotas, rate limits, single-flight, post cache), e.g.
+# redis://host:6379/0. Without it each worker process has its own local memory cache.
+REDIS_URL = config('REDIS_URL', default='')
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+    if REDIS_URL else {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+}
+GEMINI_API_KEY = config('GEMINI_API_KEY')
 
-SUPA_DATA_KEY = config('SUPA_DATA_KEY')
\ No newline at end of file
+PROXY_LIST = BASE_DIR / 'main/proxy/proxies.json'
+# Route page scraping / YouTube transcript fetches through the proxy pool (main/proxy_pool.py)
+SCRAPE_USE_PROXIES = config('SCRAPE_USE_PROXIES', default=False, cast=bool)
+TRANSCRIPT_USE_PROXIES = config('TRANSCRIPT_USE_PROXIES', default=False, cast=bool)
+
+SUPA_DATA_KEY = config('SUPA_DATA_KEY')
+
+# LLM backend: "gemini", "fake" (in-process) or "http" (e.g. `manage.py fake_llm_server`)
+LLM_BACKEND = config('LLM_BACKEND', default='gemini')
+LLM_HTTP_URL = config('LLM_HTTP_URL', default='http://127.0.0.1:8765')
+LLM_FAKE_LATENCY = config('LLM_FAKE_LATENCY', default=0.5, cast=float)
+LLM_FAKE_TOKENS_PER_SECOND = config('LLM_FAKE_TOKENS_PER_SECOND', default=200, cast=float)
+LLM_FAKE_FAILURE_RATE = config('LLM_FAKE_FAILURE_RATE', default=0.0, cast=float)
+LLM_FAKE_MALFORMED_RATE = config('LLM_FAKE_MALFORMED_RATE', default=0.0, cast=float)
+LLM_FAKE_SEED = config('LLM_FAKE_SEED', default=0, cast=int)
+LLM_FAKE_PREFILL_TOKENS_PER_SECOND = config('LLM_FAKE_PREFILL_TOKENS_PER_SECOND', default=0, cast=float)
+
+# Per-IP rate limit state (main/anti_ddos.py): "mmap" (shared by the workers of this host),
+# "cache" (CACHES, memcached/Redis for several hosts) or "local" (per process)
+ANTI_DDOS_BACKEND = config('ANTI_DDOS_BACKEND', default='mmap')
+
+# Never rate limited (IPs) / charged quotas (user emails), comma separated; for load tests
+ANTI_DDOS_EXEMPT = config('ANTI_DDOS_EXEMPT', default='', cast=Csv())
+QUOTA_EXEMPT = config('QUOTA_EXEMPT', default='', cast=Csv())
+
+# Use the native async AI/scraping views; only when served by metag/asgi.py (e.g. uvicorn)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
\ No newline at end of file